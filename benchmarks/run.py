@@ -0,0 +1,286 @@
+"""
+Бенчмарки загрузки, фильтрации, пересчета в USD, медиан по клиентам и
+агрегаций по странам/категориям на датасете, увеличенном в 1, 10 и 50 раз.
+
+Увеличенный датасет - исходный файл, записанный k раз подряд (по кускам,
+без загрузки в память), поэтому эталонные ответы известны заранее:
+счетчики умножаются на k, доли, средние, медианы и квантили не меняются.
+Эталон считается один раз на исходном файле простым pandas.
+
+Каждый бенчмарк запускается в отдельном процессе, записываются время,
+пиковый RSS процесса и его дочерних процессов, и результат сверяется
+с эталоном. Итог сохраняется в JSON, с --compare печатается сравнение
+с прошлым запуском.
+
+    python benchmarks/run.py
+    python benchmarks/run.py --scales 1 10 --only load customer_median
+    python benchmarks/run.py --compare benchmarks/results/old.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import platform
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from common.cache import cached_table
+from common.config import DATA_DIR, EXCHANGE_RATES_PATH, TRANSACTIONS_PATH
+from common.currency import RateTable
+from common.groupby import partitioned_groupby
+from common.loader import load_exchange_rates, load_transactions
+from common.moments import usd_moments_by_fraud
+from common.streaming import stream_aggregate
+
+BENCH_DIR = DATA_DIR / 'bench'
+RESULTS_DIR = Path(__file__).resolve().parent / 'results'
+SCALES = [1, 10, 50]
+
+# Относительная погрешность сверки: std с ddof=1 на k копиях отличается
+# от исходного на ~1/n, остальное совпадает до округления float
+RTOL = 1e-4
+
+
+def scaled_dataset(scale):
+    if scale == 1:
+        return TRANSACTIONS_PATH
+
+    path = BENCH_DIR / f'transaction_fraud_data_x{scale}.parquet'
+    if path.exists() and path.stat().st_mtime_ns >= TRANSACTIONS_PATH.stat().st_mtime_ns:
+        return path
+
+    BENCH_DIR.mkdir(parents=True, exist_ok=True)
+    source = pq.ParquetFile(TRANSACTIONS_PATH)
+    with pq.ParquetWriter(path, source.schema_arrow) as writer:
+        for _ in range(scale):
+            for batch in source.iter_batches(batch_size=1 << 17):
+                writer.write_batch(batch)
+    return path
+
+
+# Бенчмарки: функция(path) -> словарь чисел.
+# Ключи с префиксом 'n_' - счетчики, они растут пропорционально масштабу.
+
+def bench_load(path):
+    frame = load_transactions(path=path, cache=False)
+    return {'n_rows': len(frame)}
+
+
+def bench_load_cached(path):
+    frame = load_transactions(path=path)
+    return {'n_rows': len(frame)}
+
+
+def bench_filter(path):
+    frame = load_transactions(columns=['amount'], filters=[('is_fraud', '==', True)], path=path)
+    return {'n_rows': len(frame), 'amount_mean': frame['amount'].mean()}
+
+
+def bench_usd_conversion(path):
+    frame = load_transactions(columns=['amount', 'currency', 'timestamp', 'is_fraud'], path=path)
+    rates = RateTable.from_frame(load_exchange_rates())
+    amount_usd = rates.to_usd(frame['amount'], frame['currency'], frame['timestamp'])
+    fraud = frame['is_fraud'].to_numpy(dtype=bool)
+    return {'legit_mean': np.nanmean(amount_usd[~fraud]), 'fraud_mean': np.nanmean(amount_usd[fraud])}
+
+
+def bench_usd_moments(path):
+    moments = usd_moments_by_fraud(RateTable.from_frame(load_exchange_rates()), path=path)
+    return {
+        'legit_mean': moments[False].mean, 'legit_std': moments[False].std,
+        'fraud_mean': moments[True].mean, 'fraud_std': moments[True].std,
+    }
+
+
+def bench_customer_median(path):
+    medians = partitioned_groupby('customer_id', 'last_hour_activity.unique_merchants', 'median', path=path)
+    quantile_95 = medians.quantile(0.95)
+    return {'quantile_95': quantile_95, 'dangerous_customers': int((medians > quantile_95).sum())}
+
+
+def _aggregation_result(stats):
+    result = {}
+    for key, row in stats.iterrows():
+        key = key if isinstance(key, str) else '/'.join(key)
+        result[f'n_total.{key}'] = row['total']
+        result[f'n_fraud.{key}'] = row['fraud']
+        result[f'avg_amount.{key}'] = row['avg_amount']
+    return result
+
+
+def bench_country_aggregation(path):
+    return _aggregation_result(stream_aggregate(['country'], {
+        'total': ('is_fraud', 'count'),
+        'fraud': ('is_fraud', 'sum'),
+        'avg_amount': ('amount', 'mean'),
+    }, path=path))
+
+
+def bench_category_aggregation(path):
+    return _aggregation_result(stream_aggregate(['vendor_category', 'country'], {
+        'total': ('is_fraud', 'count'),
+        'fraud': ('is_fraud', 'sum'),
+        'avg_amount': ('amount', 'mean'),
+    }, path=path))
+
+
+BENCHMARKS = {
+    'load': bench_load,
+    'load_cached': bench_load_cached,
+    'filter': bench_filter,
+    'usd_conversion': bench_usd_conversion,
+    'usd_moments': bench_usd_moments,
+    'customer_median': bench_customer_median,
+    'country_aggregation': bench_country_aggregation,
+    'category_aggregation': bench_category_aggregation,
+}
+
+
+def reference():
+    # Эталон на исходном файле: простой pandas без модулей из common
+    df = pd.read_parquet(TRANSACTIONS_PATH)
+    rates = pd.read_parquet(EXCHANGE_RATES_PATH)
+
+    rates['date'] = pd.to_datetime(rates['date'])
+    if 'USD' not in rates.columns:
+        rates['USD'] = 1.0
+    converted = pd.merge_asof(
+        df.assign(date=df['timestamp'].dt.normalize().astype(rates['date'].dtype)).sort_values('date'),
+        rates.sort_values('date'), on='date'
+    )
+    currency_columns = [c for c in rates.columns if c != 'date']
+    rate = converted[currency_columns].to_numpy()[
+        np.arange(len(converted)), pd.Index(currency_columns).get_indexer(converted['currency'])
+    ]
+    amount_usd = converted['amount'] / rate
+    fraud_usd = amount_usd[converted['is_fraud']]
+    legit_usd = amount_usd[~converted['is_fraud']]
+
+    unique_merchants = df['last_hour_activity'].apply(lambda x: x['unique_merchants'])
+    medians = unique_merchants.groupby(df['customer_id']).median()
+    quantile_95 = medians.quantile(0.95)
+
+    def aggregation(keys):
+        stats = df.groupby(keys).agg(
+            total=('is_fraud', 'count'), fraud=('is_fraud', 'sum'), avg_amount=('amount', 'mean')
+        )
+        return _aggregation_result(stats)
+
+    return {
+        'load': {'n_rows': len(df)},
+        'load_cached': {'n_rows': len(df)},
+        'filter': {'n_rows': int(df['is_fraud'].sum()), 'amount_mean': df.loc[df['is_fraud'], 'amount'].mean()},
+        'usd_conversion': {'legit_mean': legit_usd.mean(), 'fraud_mean': fraud_usd.mean()},
+        'usd_moments': {
+            'legit_mean': legit_usd.mean(), 'legit_std': legit_usd.std(),
+            'fraud_mean': fraud_usd.mean(), 'fraud_std': fraud_usd.std(),
+        },
+        'customer_median': {'quantile_95': quantile_95, 'dangerous_customers': int((medians > quantile_95).sum())},
+        'country_aggregation': aggregation(['country']),
+        'category_aggregation': aggregation(['vendor_category', 'country']),
+    }
+
+
+def check(result, expected, scale):
+    mismatches = []
+    for key, value in expected.items():
+        value = value * scale if key.startswith('n_') else value
+        if key not in result or not np.isclose(result[key], value, rtol=RTOL, equal_nan=True):
+            mismatches.append(f'{key}: {result.get(key)} != {value}')
+    return mismatches
+
+
+def _peak_rss_mb():
+    # VmHWM - пик RSS текущего адресного пространства; ru_maxrss в Linux
+    # переживает exec и показал бы пик родителя
+    status = Path('/proc/self/status')
+    if status.exists():
+        for line in status.read_text().splitlines():
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+    # ru_maxrss в Linux в килобайтах, в macOS в байтах
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 / scale
+
+
+def _measure(name, path):
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    result = BENCHMARKS[name](path)
+    return {
+        'wall_s': time.perf_counter() - start,
+        'cpu_s': time.process_time() - cpu_start,
+        'peak_rss_mb': _peak_rss_mb(),
+        # Пик по воркерам самого бенчмарка (fork-пулы в common.parallel)
+        'peak_rss_children_mb': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+        'result': {key: float(value) for key, value in result.items()},
+    }
+
+
+def run(names, scales):
+    expected = reference()
+    runs = []
+    for scale in scales:
+        path = scaled_dataset(scale)
+        # Arrow-кэш строится здесь, а не внутри замера первого бенчмарка с кэшем
+        cached_table(path)
+        for name in names:
+            # Свежий spawn-процесс на каждый замер: пиковый RSS не копится
+            # и не включает память родителя, посчитавшего эталон
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+                measurement = pool.submit(_measure, name, str(path)).result()
+
+            mismatches = check(measurement.pop('result'), expected[name], scale)
+            runs.append({'benchmark': name, 'scale': scale, **measurement, 'ok': not mismatches,
+                         'mismatches': mismatches})
+            status = 'OK' if not mismatches else 'НЕВЕРНО: ' + '; '.join(mismatches[:3])
+            print(f"{name:<22} x{scale:<4} {measurement['wall_s']:>9.3f} с "
+                  f"{measurement['peak_rss_mb']:>9.1f} МБ  {status}")
+    return runs
+
+
+def compare(runs, previous_path, threshold=0.1):
+    previous = {(r['benchmark'], r['scale']): r for r in json.loads(Path(previous_path).read_text())['runs']}
+    print(f'\nСравнение с {previous_path} (регрессия - медленнее более чем на {threshold:.0%}):')
+    for r in runs:
+        old = previous.get((r['benchmark'], r['scale']))
+        if old is None:
+            continue
+        ratio = r['wall_s'] / old['wall_s']
+        flag = '  РЕГРЕССИЯ' if ratio > 1 + threshold else ''
+        print(f"{r['benchmark']:<22} x{r['scale']:<4} {old['wall_s']:>8.3f} -> {r['wall_s']:>8.3f} с "
+              f"({ratio:.2f}x){flag}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Бенчмарки аналитических пайплайнов')
+    parser.add_argument('--scales', type=int, nargs='+', default=SCALES)
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument('--output', type=Path, default=None, help='куда сохранить JSON')
+    parser.add_argument('--compare', type=Path, default=None, help='JSON прошлого запуска')
+    args = parser.parse_args()
+
+    runs = run(args.only, args.scales)
+
+    output = args.output or RESULTS_DIR / f"{datetime.now():%Y%m%d_%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'runs': runs,
+    }, indent=2, ensure_ascii=False))
+    print(f'\nРезультаты сохранены в {output}')
+
+    if args.compare:
+        compare(runs, args.compare)
@@ -0,0 +1,3 @@
+"""
+Общие модули для скриптов data_analysis и free_analysis.
+"""
@@ -0,0 +1,99 @@
+"""
+Гистограмма активности клиентов по целочисленным корзинам времени.
+
+Время переводится в номер корзины от эпохи (час, минута, день):
+14:00 разных дней - разные корзины, в отличие от timestamp.dt.hour.
+Клиент кодируется целым числом, пара (клиент, корзина) - одним int64
+ключом клиент * число_корзин + корзина. Если все возможные ключи
+помещаются в плотный массив, пары считаются через bincount, иначе -
+сортировкой ключей (np.unique). Результат - три массива (клиент,
+корзина, число транзакций) только по непустым парам, без MultiIndex.
+
+    histogram = ActivityHistogram.from_frame(transactions, freq='h')
+    histogram.mean_per_bucket()          # в среднем транзакций за активный час
+    histogram.rate_per_customer()        # транзакций в час по каждому клиенту
+"""
+
+import numpy as np
+import pandas as pd
+
+from common.trace import traced
+from common.windows import _codes, _micros
+
+# Плотный bincount, пока массив счетчиков не больше стольких ключей на строку
+DENSE_FACTOR = 4
+
+
+def _width(freq):
+    # 'h', 'min', 'D', '15min' -> Timedelta
+    return pd.Timedelta(pd.tseries.frequencies.to_offset(freq))
+
+
+def bucket_ids(timestamp, freq='h'):
+    width = _width(freq) // pd.Timedelta(microseconds=1)
+    return _micros(timestamp) // width
+
+
+def count_pairs(customer, bucket):
+    # Непустые пары (клиент, корзина) и число строк в каждой, по возрастанию ключа
+    first = bucket.min() if len(bucket) else 0
+    n_buckets = int(bucket.max() - first + 1) if len(bucket) else 0
+    keys = customer.astype('int64') * n_buckets + (bucket - first)
+
+    size = int(customer.max() + 1) * n_buckets if len(customer) else 0
+    if size <= DENSE_FACTOR * len(keys) + 1024:
+        counts = np.bincount(keys, minlength=size)
+        keys = np.flatnonzero(counts)
+        counts = counts[keys]
+    else:
+        keys, counts = np.unique(keys, return_counts=True)
+    return keys // n_buckets, keys % n_buckets + first, counts
+
+
+class ActivityHistogram:
+    def __init__(self, customer, bucket, count, customers, freq):
+        self.customer = customer
+        self.bucket = bucket
+        self.count = count
+        self.customers = customers
+        self.freq = freq
+
+    @classmethod
+    @traced('ActivityHistogram.from_frame')
+    def from_frame(cls, frame, freq='h', key='customer_id', time='timestamp'):
+        values = frame[key]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            customers = values.cat.categories
+        else:
+            customers = pd.Index(pd.unique(values))
+            values = pd.Categorical(values, categories=customers)
+        customer = _codes(pd.Series(values))
+        return cls(*count_pairs(customer, bucket_ids(frame[time], freq)), customers, freq)
+
+    def mean_per_bucket(self):
+        # Среднее число транзакций клиента по корзинам, где он был активен
+        return self.count.mean()
+
+    def rate_per_customer(self, include_empty=False):
+        # Транзакций на корзину по каждому клиенту: по активным корзинам или
+        # по всему промежутку от первой до последней активности клиента
+        n = len(self.customers)
+        total = np.bincount(self.customer, weights=self.count, minlength=n)
+        if include_empty:
+            first = np.full(n, np.iinfo('int64').max)
+            last = np.full(n, np.iinfo('int64').min)
+            np.minimum.at(first, self.customer, self.bucket)
+            np.maximum.at(last, self.customer, self.bucket)
+            buckets = np.where(total > 0, last - first + 1, 0)
+        else:
+            buckets = np.bincount(self.customer, minlength=n)
+        rate = total / np.where(buckets > 0, buckets, np.nan)
+        return pd.Series(rate, index=self.customers, name=f'transactions_per_{self.freq}').dropna()
+
+    def to_frame(self):
+        width = _width(self.freq)
+        return pd.DataFrame({
+            'customer_id': self.customers[self.customer],
+            'bucket_start': pd.Timestamp(0) + self.bucket * width,
+            'count': self.count,
+        })
@@ -0,0 +1,263 @@
+"""
+Два движка для фильтров, агрегатов по группам, top-k и join'ов.
+
+Функции принимают таблицу движка и возвращают таблицу того же движка:
+pa.Table обрабатывается pyarrow.compute и Table.group_by (многопоточные
+ядра Arrow, без конвертации в pandas), pd.DataFrame - средствами pandas.
+В pandas переводится только маленький результат (to_pandas).
+
+Движок выбирается при загрузке: load(..., backend='arrow' | 'pandas'),
+по умолчанию config.BACKEND (переменная окружения FRAUD_BACKEND).
+
+    t = load(['country', 'is_fraud', 'amount'], filters=[('is_fraud', '==', True)])
+    stats = aggregate(t, ['country'], {'fraud': ('is_fraud', 'count'), 'avg': ('amount', 'mean')})
+    top = top_k(stats, 'fraud', 5)
+    print(to_pandas(top))
+
+Агрегаты: count, sum, mean, std, var (ddof=1), min, max, median, approx_median,
+nunique. median точная в обоих движках (в Arrow - по спискам значений групп),
+approx_median в Arrow приближенная (t-digest) и дешевле, в pandas точная.
+Сравнение движков на наборе запросов, с кэшем и без:
+    python -m common.backend
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from common.cache import cached_table
+from common.config import BACKEND, TRANSACTIONS_PATH, USE_CACHE
+from common.loader import load_transactions, read_table
+from common.trace import traced
+
+BACKENDS = ('arrow', 'pandas')
+
+# Агрегат -> (функция Arrow, опции)
+ARROW_AGGREGATIONS = {
+    'count': ('count', None),
+    'sum': ('sum', None),
+    'mean': ('mean', None),
+    'std': ('stddev', pc.VarianceOptions(ddof=1)),
+    'var': ('variance', pc.VarianceOptions(ddof=1)),
+    'min': ('min', None),
+    'max': ('max', None),
+    # Точной медианы по группам в Arrow нет: собираем списки значений и считаем quantile
+    'median': ('list', None),
+    'approx_median': ('approximate_median', None),
+    'nunique': ('count_distinct', None),
+}
+
+
+def _is_arrow(table):
+    return isinstance(table, pa.Table)
+
+
+@traced('backend.load')
+def load(columns=None, filters=None, path=TRANSACTIONS_PATH, backend=BACKEND, cache=USE_CACHE):
+    if backend not in BACKENDS:
+        raise ValueError(f"Неизвестный движок '{backend}', доступны {BACKENDS}")
+    if backend == 'arrow':
+        return read_table(path, columns, filters, cache)
+    return load_transactions(columns, filters, path, cache)
+
+
+def to_pandas(table):
+    return table.to_pandas() if _is_arrow(table) else table
+
+
+def filter_rows(table, filters):
+    # filters в формате pyarrow: [('col', '==', v), ...] или список таких списков (ИЛИ)
+    if _is_arrow(table):
+        return table.filter(pq.filters_to_expression(filters))
+
+    groups = filters if isinstance(filters[0], list) else [filters]
+    mask = np.zeros(len(table), dtype=bool)
+    for group in groups:
+        group_mask = np.ones(len(table), dtype=bool)
+        for column, op, value in group:
+            values = table[column]
+            if op in ('in', 'not in'):
+                condition = values.isin(value)
+                condition = ~condition if op == 'not in' else condition
+            else:
+                condition = {
+                    '==': values.eq, '=': values.eq, '!=': values.ne,
+                    '<': values.lt, '<=': values.le, '>': values.gt, '>=': values.ge,
+                }[op](value)
+            group_mask &= condition.to_numpy(dtype=bool)
+        mask |= group_mask
+    return table[mask]
+
+
+@traced('backend.aggregate')
+def aggregate(table, keys, aggs):
+    for column, how in aggs.values():
+        if how not in ARROW_AGGREGATIONS:
+            raise ValueError(f"Неподдерживаемая агрегация '{how}' для колонки '{column}'")
+
+    if _is_arrow(table):
+        # Без кэша у каждого row group свой словарь, а group_by требует общий
+        table = table.unify_dictionaries()
+        specs = list(dict.fromkeys((column, how) for column, how in aggs.values()))
+        group_keys = list(keys)
+        if not keys and any(how == 'median' for _, how in specs):
+            # Без ключей group_by считает скалярные агрегаты, а 'list' среди них нет - одна группа по null
+            table = table.append_column('_all', pa.nulls(len(table), pa.int8()))
+            group_keys = ['_all']
+        result = table.group_by(group_keys).aggregate([
+            (column, *[x for x in ARROW_AGGREGATIONS[how] if x is not None]) for column, how in specs
+        ])
+        # Arrow называет колонки column_function
+        names = {
+            name: f'{column}_{ARROW_AGGREGATIONS[how][0]}' for name, (column, how) in aggs.items()
+        }
+        result = result.select(list(keys) + list(names.values())).rename_columns(list(keys) + list(names))
+        for name, (column, how) in aggs.items():
+            if how == 'median':
+                # Как в pandas: линейная интерполяция, пропуски не учитываются
+                medians = [pc.quantile(group.values, 0.5)[0].as_py() for group in result[name].combine_chunks()]
+                result = result.set_column(result.schema.get_field_index(name), name, pa.array(medians, pa.float64()))
+        # Словарные ключи раскрываем, чтобы сортировка шла по значениям
+        for i, field in enumerate(result.schema):
+            if pa.types.is_dictionary(field.type):
+                result = result.set_column(i, field.name, result.column(i).cast(field.type.value_type))
+        if keys:
+            result = result.sort_by([(k, 'ascending') for k in keys])
+        return result
+
+    named = {name: (column, 'median' if how == 'approx_median' else how) for name, (column, how) in aggs.items()}
+    if not keys:
+        return pd.DataFrame({name: [table[column].agg(how)] for name, (column, how) in named.items()})
+    return table.groupby(keys, observed=True).agg(**named).reset_index()
+
+
+def top_k(table, column, k, ascending=False):
+    if _is_arrow(table):
+        order = 'ascending' if ascending else 'descending'
+        return pc.take(table, pc.select_k_unstable(table, k, sort_keys=[(column, order)]))
+    return table.nsmallest(k, column) if ascending else table.nlargest(k, column)
+
+
+def join(left, right, keys, how='inner'):
+    # how как в pandas: inner, left, right, outer
+    if _is_arrow(left):
+        join_type = {'inner': 'inner', 'left': 'left outer', 'right': 'right outer', 'outer': 'full outer'}[how]
+        return left.join(right, keys, join_type=join_type)
+    return left.merge(right, on=keys, how=how)
+
+
+def _rates_long(rates, backend):
+    # Плотная таблица курсов RateTable -> длинная (day, currency, rate) для join'а
+    days, currencies = rates.rates.shape
+    frame = pd.DataFrame({
+        'day': np.repeat(np.arange(days), currencies),
+        'currency': np.tile(np.asarray(rates.currencies, dtype=object), days),
+        'rate': rates.rates.ravel(),
+    })
+    if backend != 'arrow':
+        return frame
+    schema = pa.schema([('day', pa.int64()), ('currency', pa.string()), ('rate', pa.float64())])
+    return pa.Table.from_pandas(frame, schema=schema, preserve_index=False)
+
+
+def _with_day(table, rates):
+    # Индекс дня в таблице курсов; даты после последнего курса - последний курс
+    last = len(rates.rates) - 1
+    if _is_arrow(table):
+        start = pa.scalar(rates.start.astype('datetime64[us]'))
+        micros = pc.cast(pc.subtract(pc.cast(table['timestamp'], pa.timestamp('us')), start), pa.int64())
+        day = pc.min_element_wise(pc.floor(pc.divide(pc.cast(micros, pa.float64()), 86_400e6)), last)
+        table = table.append_column('day', pc.cast(day, pa.int64()))
+        if pa.types.is_dictionary(table.schema.field('currency').type):
+            table = table.set_column(
+                table.schema.get_field_index('currency'), 'currency', table['currency'].cast(pa.string())
+            )
+        return table
+    day = np.minimum(rates.day_index(table['timestamp']), last)
+    return table.assign(day=day, currency=table['currency'].astype(object))
+
+
+def _queries(rates):
+    # Набор запросов для сравнения движков: имя -> функция(backend, cache)
+    def fraud_by_country(backend, cache):
+        t = load(['country', 'is_fraud', 'amount'], backend=backend, cache=cache)
+        stats = aggregate(t, ['country'], {
+            'total': ('is_fraud', 'count'), 'fraud': ('is_fraud', 'sum'), 'avg_amount': ('amount', 'mean'),
+        })
+        return to_pandas(stats)
+
+    def top_fraud_countries(backend, cache):
+        t = load(['country', 'is_fraud'], filters=[('is_fraud', '==', True)], backend=backend, cache=cache)
+        return to_pandas(top_k(aggregate(t, ['country'], {'fraud': ('is_fraud', 'count')}), 'fraud', 5))
+
+    def amount_by_category(backend, cache):
+        t = load(['vendor_category', 'vendor_type', 'amount'], backend=backend, cache=cache)
+        t = filter_rows(t, [('vendor_type', '!=', 'online')])
+        return to_pandas(aggregate(t, ['vendor_category'], {
+            'std': ('amount', 'std'), 'median': ('amount', 'median'), 'max': ('amount', 'max'),
+        }))
+
+    def usd_by_fraud(backend, cache):
+        t = _with_day(load(['amount', 'currency', 'timestamp', 'is_fraud'], backend=backend, cache=cache), rates)
+        t = join(t, _rates_long(rates, backend), ['day', 'currency'])
+        if _is_arrow(t):
+            t = t.append_column('amount_usd', pc.divide(t['amount'], t['rate']))
+        else:
+            t = t.assign(amount_usd=t['amount'] / t['rate'])
+        return to_pandas(aggregate(t, ['is_fraud'], {'mean': ('amount_usd', 'mean'), 'std': ('amount_usd', 'std')}))
+
+    return {
+        'fraud_by_country': fraud_by_country,
+        'top_fraud_countries': top_fraud_countries,
+        'amount_by_category': amount_by_category,
+        'usd_by_fraud': usd_by_fraud,
+    }
+
+
+def _same(a, b, rtol):
+    if list(a.columns) != list(b.columns) or len(a) != len(b):
+        return False
+    a, b = a.reset_index(drop=True), b.reset_index(drop=True)
+    for column in a.columns:
+        if pd.api.types.is_numeric_dtype(a[column]) and pd.api.types.is_numeric_dtype(b[column]):
+            if not np.allclose(a[column].astype(float), b[column].astype(float), rtol=rtol, equal_nan=True):
+                return False
+        elif not (a[column].astype(str) == b[column].astype(str)).all():
+            return False
+    return True
+
+
+def compare(rates, rtol=1e-6, caches=(True, False)):
+    # Без кэша Parquet читается по row group'ам со своими словарями - другой путь загрузки
+    if True in caches:
+        # Построение кэша не должно попасть в замер первого запроса
+        cached_table(TRANSACTIONS_PATH)
+    report = []
+    for cache in caches:
+        for name, run in _queries(rates).items():
+            report.append(_compare_query(name, run, cache, rtol))
+    return pd.DataFrame(report)
+
+
+def _compare_query(name, run, cache, rtol):
+    timings, results = {}, {}
+    for backend in BACKENDS:
+        start = time.perf_counter()
+        results[backend] = run(backend, cache)
+        timings[backend] = time.perf_counter() - start
+    return {
+        'query': name, 'cache': cache, 'arrow_s': timings['arrow'], 'pandas_s': timings['pandas'],
+        'speedup': timings['pandas'] / timings['arrow'],
+        'same': _same(results['arrow'], results['pandas'], rtol),
+    }
+
+
+if __name__ == '__main__':
+    from common.currency import RateTable
+    from common.loader import load_exchange_rates
+
+    print(compare(RateTable.from_frame(load_exchange_rates())).round(3).to_string(index=False))
@@ -0,0 +1,98 @@
+"""
+Кэш датасета в несжатом Arrow IPC (Feather v2).
+
+Parquet при каждом запуске заново распаковывается и декодируется.
+Здесь исходный файл один раз переписывается в несжатый .arrow, а дальше
+читается через memory map без копирования: несколько процессов разделяют
+одну копию в page cache.
+
+Рядом с .arrow лежит .json с mtime, размером и sha256 исходника.
+Если mtime и размер совпали - кэш валиден без чтения файла; если нет -
+пересчитывается хэш, и кэш перестраивается только при его изменении.
+Категориальные колонки (config.CATEGORICAL_COLUMNS) хранятся в кэше
+dictionary-encoded, как они лежат в словарях Parquet.
+"""
+
+import hashlib
+import json
+import os
+
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+from common.config import CACHE_DIR, CATEGORICAL_COLUMNS
+
+# Меняется при изменении формата кэша, старые файлы тогда перестраиваются
+CACHE_FORMAT = 2
+
+
+def file_hash(path, chunk_size=1 << 24):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _cache_paths(source):
+    name = os.path.basename(source).rsplit('.', 1)[0]
+    return CACHE_DIR / f'{name}.arrow', CACHE_DIR / f'{name}.json'
+
+
+def _source_meta(source, with_hash):
+    stat = os.stat(source)
+    meta = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+    if with_hash:
+        meta['sha256'] = file_hash(source)
+    return meta
+
+
+def _write_atomic(path, write):
+    # Пишем во временный файл и подменяем, чтобы параллельные процессы
+    # никогда не увидели недописанный кэш
+    tmp = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def is_fresh(source):
+    arrow_path, meta_path = _cache_paths(source)
+    if not arrow_path.exists() or not meta_path.exists():
+        return False
+
+    cached = json.loads(meta_path.read_text())
+    if cached.get('format') != CACHE_FORMAT:
+        return False
+    current = _source_meta(source, with_hash=False)
+    if current['mtime_ns'] == cached['mtime_ns'] and current['size'] == cached['size']:
+        return True
+
+    # mtime изменился (например, файл скопировали заново) - сверяем содержимое
+    if current['size'] != cached['size'] or file_hash(source) != cached['sha256']:
+        return False
+    cached.update(current)
+    _write_atomic(meta_path, lambda p: p.write_text(json.dumps(cached)))
+    return True
+
+
+def build(source):
+    arrow_path, meta_path = _cache_paths(source)
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+    meta = _source_meta(source, with_hash=True)
+    meta['format'] = CACHE_FORMAT
+    names = pq.read_schema(source).names
+    table = pq.read_table(source, read_dictionary=[c for c in CATEGORICAL_COLUMNS if c in names])
+    _write_atomic(arrow_path, lambda p: feather.write_feather(table, p, compression='uncompressed'))
+    _write_atomic(meta_path, lambda p: p.write_text(json.dumps(meta)))
+
+
+def cached_table(source):
+    source = str(source)
+    if not is_fresh(source):
+        build(source)
+
+    arrow_path, _ = _cache_paths(source)
+    with pa.memory_map(str(arrow_path)) as source_map:
+        return pa.ipc.open_file(source_map).read_all()
@@ -0,0 +1,46 @@
+"""
+Тонкий клиент сервера запросов (common.server).
+
+Только стандартная библиотека: без pandas и pyarrow клиент запускается
+за десятки миллисекунд.
+
+    request('task_7')
+    request('fraud_rates', {'dimension': 'country'}, socket_path='/tmp/fraud.sock')
+"""
+
+import http.client
+import json
+import socket
+from urllib.parse import quote, urlencode
+
+from common.config import SERVER_HOST, SERVER_PORT
+
+
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path, timeout=60):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def request(name, params=None, port=SERVER_PORT, socket_path=None, timeout=60):
+    if socket_path:
+        connection = _UnixConnection(socket_path, timeout)
+    else:
+        connection = http.client.HTTPConnection(SERVER_HOST, port, timeout=timeout)
+    path = f'/query/{quote(name)}'
+    if params:
+        path += '?' + urlencode(params)
+    try:
+        connection.request('GET', path)
+        response = connection.getresponse()
+        body = json.loads(response.read())
+    finally:
+        connection.close()
+    if response.status != 200:
+        raise RuntimeError(body.get('error', response.reason))
+    return body
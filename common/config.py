@@ -0,0 +1,57 @@
+"""
+Расположение датасета.
+
+Все скрипты берут пути отсюда, а не из относительных путей от своей папки.
+Каталог с данными можно переопределить переменной окружения FRAUD_DATA_DIR,
+каталог кэша - FRAUD_CACHE_DIR; FRAUD_CACHE=0 отключает кэш,
+FRAUD_EXACT_QUANTILES=1 включает точные квантили вместо t-digest,
+FRAUD_COMPACT=0 отключает категориальные колонки и сужение типов,
+FRAUD_ARROW_DTYPES=1 оставляет остальные колонки в Arrow-буферах (pd.ArrowDtype),
+FRAUD_TRACE=<файл.json или каталог/> включает замеры по этапам (common.trace),
+FRAUD_TRACE_MEMORY=1 добавляет к ним пик аллокаций через tracemalloc,
+FRAUD_SERVER_PORT задает порт сервера запросов,
+FRAUD_BACKEND=arrow|pandas выбирает движок common.backend.
+"""
+
+import os
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+
+DATA_DIR = Path(os.environ.get('FRAUD_DATA_DIR', ROOT_DIR / 'free_analysis' / 'src'))
+
+TRANSACTIONS_PATH = DATA_DIR / 'transaction_fraud_data.parquet'
+EXCHANGE_RATES_PATH = DATA_DIR / 'historical_currency_exchange.parquet'
+
+CACHE_DIR = Path(os.environ.get('FRAUD_CACHE_DIR', DATA_DIR / 'cache'))
+USE_CACHE = os.environ.get('FRAUD_CACHE', '1') != '0'
+EXACT_QUANTILES = os.environ.get('FRAUD_EXACT_QUANTILES', '0') == '1'
+COMPACT = os.environ.get('FRAUD_COMPACT', '1') != '0'
+ARROW_DTYPES = os.environ.get('FRAUD_ARROW_DTYPES', '0') == '1'
+BACKEND = os.environ.get('FRAUD_BACKEND', 'arrow')
+TRACE_PATH = os.environ.get('FRAUD_TRACE')
+TRACE_MEMORY = os.environ.get('FRAUD_TRACE_MEMORY', '0') == '1'
+
+# Строковые колонки с малым числом значений, которые держим как категории
+CATEGORICAL_COLUMNS = [
+    'country', 'city', 'city_size', 'vendor_category', 'vendor_type', 'currency',
+    'card_type', 'channel', 'device', 'customer_id',
+]
+
+CUBE_PATH = DATA_DIR / 'transaction_cube.parquet'
+
+# Датасет, разделенный data_separation.py: risk_group=/country=/date=
+RISK_SPLIT_PATH = DATA_DIR / 'risk_split'
+
+# Порог доли мошенничества, с которого страна или группа считается высокорисковой
+FRAUD_RATE_THRESHOLD = 0.20
+
+# Состояние инкрементального монитора (common.monitor)
+MONITOR_DIR = DATA_DIR / 'monitor'
+
+# Сервер запросов (python main.py serve)
+SERVER_HOST = '127.0.0.1'
+SERVER_PORT = int(os.environ.get('FRAUD_SERVER_PORT', '8765'))
+
+# Куда пакетная отрисовка (common.render) сохраняет графики
+IMG_DIR = Path(os.environ.get('FRAUD_IMG_DIR', ROOT_DIR / 'free_analysis' / 'img'))
@@ -0,0 +1,83 @@
+"""
+Предагрегированный куб транзакций.
+
+Один потоковый проход по сырым данным строит таблицу на уровне
+country x vendor_category x vendor_type x date x channel x флаги
+(is_card_present, is_outside_home_country, is_high_risk_vendor, is_weekend)
+с мерами count, fraud_count, amount_sum, fraud_amount_sum и сохраняет ее
+в небольшой Parquet рядом с датасетом. Куб перестраивается, если исходный
+файл новее.
+
+rollup(dimensions, filters) сворачивает куб до нужных измерений:
+    rollup(['country'])
+    rollup(['vendor_category'], filters={'country': ['Brazil', 'Mexico']})
+и добавляет fraud_rate и avg_amount.
+"""
+
+import os
+from functools import lru_cache
+from pathlib import Path
+
+import pandas as pd
+
+from common.cache import _write_atomic
+from common.config import CUBE_PATH, TRANSACTIONS_PATH
+from common.streaming import stream_aggregate
+from common.trace import traced
+
+DIMENSIONS = [
+    'country', 'vendor_category', 'vendor_type', 'date', 'channel',
+    'is_card_present', 'is_outside_home_country', 'is_high_risk_vendor', 'is_weekend',
+]
+MEASURES = ['count', 'fraud_count', 'amount_sum', 'fraud_amount_sum']
+
+
+def _prepare(frame):
+    return frame.assign(
+        date=frame['timestamp'].dt.date,
+        fraud_amount=frame['amount'].where(frame['is_fraud'], 0.0),
+    )
+
+
+@traced()
+def build_cube(path=TRANSACTIONS_PATH, cube_path=CUBE_PATH):
+    columns = [d for d in DIMENSIONS if d != 'date'] + ['timestamp', 'amount', 'is_fraud']
+    cube = stream_aggregate(DIMENSIONS, {
+        'count': ('is_fraud', 'count'),
+        'fraud_count': ('is_fraud', 'sum'),
+        'amount_sum': ('amount', 'sum'),
+        'fraud_amount_sum': ('fraud_amount', 'sum'),
+    }, columns=columns, path=path, prepare=_prepare).reset_index()
+
+    cube['fraud_count'] = cube['fraud_count'].astype('int64')
+    _write_atomic(Path(cube_path), lambda p: cube.to_parquet(p, index=False))
+    return cube
+
+
+@lru_cache(maxsize=None)
+def _read_cube(cube_path, mtime_ns):
+    return pd.read_parquet(cube_path)
+
+
+def load_cube(path=TRANSACTIONS_PATH, cube_path=CUBE_PATH):
+    if not os.path.exists(cube_path) or os.stat(cube_path).st_mtime_ns < os.stat(path).st_mtime_ns:
+        build_cube(path, cube_path)
+    return _read_cube(str(cube_path), os.stat(cube_path).st_mtime_ns)
+
+
+@traced()
+def rollup(dimensions, filters=None, cube=None):
+    cube = load_cube() if cube is None else cube
+    if filters:
+        for dimension, value in filters.items():
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            cube = cube[cube[dimension].isin(values)]
+
+    if dimensions:
+        result = cube.groupby(list(dimensions), observed=True)[MEASURES].sum().reset_index()
+    else:
+        result = cube[MEASURES].sum().to_frame().T
+
+    result['fraud_rate'] = result['fraud_count'] / result['count']
+    result['avg_amount'] = result['amount_sum'] / result['count']
+    return result
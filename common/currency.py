@@ -0,0 +1,80 @@
+"""
+Пересчет сумм транзакций в доллары США.
+
+Файл с историческими курсами один раз превращается в плотную таблицу
+(день x код валюты), после чего целая колонка сумм пересчитывается
+одним векторным обращением по индексам вместо merge + apply по строкам.
+Пропущенные даты заполняются последним известным курсом.
+"""
+
+import numpy as np
+import pandas as pd
+
+from common.trace import traced
+
+
+def _days(values):
+    # Колонки, уже хранящие время (в т.ч. pd.ArrowDtype), переводятся в дни напрямую:
+    # pd.to_datetime над Arrow-колонкой идет по элементам
+    if not pd.api.types.is_datetime64_any_dtype(values):
+        values = pd.to_datetime(values)
+    return np.asarray(values, dtype='datetime64[D]')
+
+
+class RateTable:
+    def __init__(self, start, rates, currencies):
+        # start - первый день таблицы (datetime64[D])
+        # rates - массив (число дней, число валют): сколько единиц валюты за 1 USD
+        # currencies - коды валют в порядке колонок rates
+        self.start = np.datetime64(start, 'D')
+        self.rates = rates
+        self.currencies = pd.Index(currencies)
+
+    @classmethod
+    def from_frame(cls, exchange_rates):
+        exchange_rates = exchange_rates.copy()
+        if 'USD' not in exchange_rates.columns:
+            exchange_rates['USD'] = 1.0
+
+        days = _days(exchange_rates['date'])
+        currencies = sorted(c for c in exchange_rates.columns if c != 'date')
+        values = exchange_rates[currencies].to_numpy(dtype='float64')
+
+        # Плотная сетка по всем дням от первого до последнего
+        start = days.min()
+        n_days = int((days.max() - start).astype(int)) + 1
+        rates = np.full((n_days, len(currencies)), np.nan)
+        rates[(days - start).astype(int)] = values
+
+        # As-of: каждая пустая ячейка берет последний известный курс выше по таблице
+        filled = np.where(np.isnan(rates), 0, np.arange(n_days)[:, None])
+        np.maximum.accumulate(filled, axis=0, out=filled)
+        rates = rates[filled, np.arange(len(currencies))]
+
+        return cls(start, rates, currencies)
+
+    @classmethod
+    def from_parquet(cls, path):
+        return cls.from_frame(pd.read_parquet(path))
+
+    def day_index(self, timestamps):
+        days = _days(timestamps)
+        return (days - self.start).astype('int64')
+
+    def currency_codes(self, currency):
+        return pd.Categorical(currency, categories=self.currencies).codes.astype('int64')
+
+    @traced()
+    def to_usd(self, amount, currency, timestamp):
+        amount = np.asarray(amount, dtype='float64')
+        days = self.day_index(timestamp)
+        codes = self.currency_codes(currency)
+
+        # Даты после последнего курса берут последний известный курс,
+        # до первого курса и неизвестные валюты остаются NaN
+        valid = (days >= 0) & (codes >= 0)
+        days = np.minimum(days, len(self.rates) - 1)
+
+        rate = np.full(len(amount), np.nan)
+        rate[valid] = self.rates[days[valid], codes[valid]]
+        return amount / rate
@@ -0,0 +1,99 @@
+"""
+Гистограмма и KDE для больших выборок за один проход.
+
+DistributionSummary накапливает по кускам данных:
+    - гистограмму с фиксированными bins;
+    - линейное биннирование на мелкую сетку из grid_size точек;
+    - моменты (count, std) для ширины окна по правилу Скотта, как в seaborn;
+    - квантили через common.sketches.make_sketch (t-digest, точные при
+      FRAUD_EXACT_QUANTILES=1): summary.quantiles.quantile([0.5, 0.95]).
+KDE считается сверткой сетки с гауссовым ядром через FFT, поэтому время и
+память зависят от числа бинов, а не от числа транзакций.
+
+Границы сетки нужно знать заранее (low, high): для данных в памяти их
+берет from_values, для потока - например min/max из common.moments.
+Пустая выборка дает нулевые гистограмму и KDE; у постоянной (low == high)
+границы раздвигаются на относительный эпсилон, а KDE с нулевым std
+сглаживается на один шаг сетки.
+"""
+
+import numpy as np
+
+from common.moments import Moments
+from common.sketches import make_sketch
+
+
+# Полуширина сетки для постоянной выборки, относительно |low| (но не меньше EPSILON)
+EPSILON = 1e-9
+
+
+class DistributionSummary:
+    def __init__(self, low, high, bins=50, grid_size=2048):
+        if not high > low:
+            # При low == high шаг сетки нулевой, а деление на него дает inf/nan
+            pad = EPSILON * max(abs(low), 1.0)
+            low, high = low - pad, high + pad
+        self.edges = np.linspace(low, high, bins + 1)
+        self.grid = np.linspace(low, high, grid_size)
+        self.counts = np.zeros(bins)
+        self.grid_counts = np.zeros(grid_size)
+        self.moments = Moments()
+        self.quantiles = make_sketch()
+
+    @classmethod
+    def from_values(cls, values, bins=50, grid_size=2048):
+        values = np.asarray(values, dtype='float64')
+        values = values[~np.isnan(values)]
+        low, high = (values.min(), values.max()) if len(values) else (0.0, 0.0)
+        summary = cls(low, high, bins, grid_size)
+        return summary.update(values)
+
+    def update(self, values):
+        values = np.asarray(values, dtype='float64')
+        values = values[~np.isnan(values)]
+        self.counts += np.histogram(values, self.edges)[0]
+
+        # Линейное биннирование: вес точки делится между двумя соседними узлами сетки
+        step = self.grid[1] - self.grid[0]
+        position = np.clip((values - self.grid[0]) / step, 0, len(self.grid) - 1)
+        left = np.minimum(position.astype('int64'), len(self.grid) - 2)
+        right_weight = position - left
+        size = len(self.grid)
+        self.grid_counts += np.bincount(left, weights=1 - right_weight, minlength=size)
+        self.grid_counts += np.bincount(left + 1, weights=right_weight, minlength=size)
+
+        self.moments = self.moments.merge(Moments.from_values(values))
+        self.quantiles.update(values)
+        return self
+
+    def bandwidth(self):
+        # Правило Скотта, как в scipy.stats.gaussian_kde и seaborn
+        return self.moments.std * self.moments.count ** (-1 / 5)
+
+    def kde(self, bandwidth=None):
+        step = self.grid[1] - self.grid[0]
+        size = len(self.grid)
+        if not self.moments.count:
+            return self.grid, np.zeros(size)
+        bandwidth = bandwidth or self.bandwidth()
+        if not bandwidth > 0:
+            # std == 0 (постоянная выборка) или nan (одно значение): ядро шириной в шаг сетки
+            bandwidth = step
+
+        # Ядро до 4 сигм, но не длиннее сетки
+        half = min(size - 1, int(np.ceil(4 * bandwidth / step)))
+        offsets = np.arange(-half, half + 1) * step
+        kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2)
+
+        n_fft = 1 << int(np.ceil(np.log2(size + len(kernel) - 1)))
+        convolved = np.fft.irfft(np.fft.rfft(self.grid_counts, n_fft) * np.fft.rfft(kernel, n_fft), n_fft)
+        density = convolved[half:half + size] / (self.moments.count * bandwidth * np.sqrt(2 * np.pi))
+
+        # Шум округления FFT (~1e-16 от максимума) обнуляем, иначе он виден на log-шкале
+        density[density < density.max() * 1e-13] = 0
+        return self.grid, density
+
+    def kde_counts(self, bandwidth=None):
+        # KDE в масштабе гистограммы (число операций на бин), как histplot(kde=True)
+        grid, density = self.kde(bandwidth)
+        return grid, density * self.moments.count * (self.edges[1] - self.edges[0])
@@ -0,0 +1,61 @@
+"""
+Геоданные стран для карт без сети.
+
+Natural Earth берется из архивов, которые лежат в репозитории
+(free_analysis/geodata или free_analysis/temp_geo). При первом запуске
+шейпфайл разбирается один раз и сохраняется облегченный GeoParquet
+только с нужными колонками:
+    NAME      - название страны в Natural Earth
+    country   - название страны как в датасете транзакций (ключ для merge)
+    label_x/y - заранее посчитанные точки для подписей (центроиды)
+Дальше карты читают этот файл, пока исходный архив не изменится.
+"""
+
+import warnings
+
+import geopandas as gpd
+
+from common.cache import _write_atomic
+from common.config import CACHE_DIR, ROOT_DIR
+
+GEO_SOURCES = [
+    ROOT_DIR / 'free_analysis' / 'geodata' / 'ne_110m_admin_0_countries.zip',
+    ROOT_DIR / 'free_analysis' / 'temp_geo' / 'countries.zip',
+]
+GEO_CACHE_PATH = CACHE_DIR / 'countries.parquet'
+
+# Название в Natural Earth -> название в датасете
+COUNTRY_ALIASES = {
+    'United Kingdom': 'UK',
+    'United States of America': 'USA',
+}
+
+
+def _source():
+    for path in GEO_SOURCES:
+        if path.exists():
+            return path
+    raise FileNotFoundError(f"Не найден архив с геоданными: {', '.join(map(str, GEO_SOURCES))}")
+
+
+def build_world(source):
+    world = gpd.read_file(source)[['NAME', 'geometry']]
+    world['country'] = world['NAME'].replace(COUNTRY_ALIASES)
+
+    # Центроиды в тех же координатах, в которых рисуется карта
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', UserWarning)
+        centroids = world.geometry.centroid
+    world['label_x'] = centroids.x
+    world['label_y'] = centroids.y
+
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    _write_atomic(GEO_CACHE_PATH, world.to_parquet)
+    return world
+
+
+def load_world():
+    source = _source()
+    if GEO_CACHE_PATH.exists() and GEO_CACHE_PATH.stat().st_mtime_ns >= source.stat().st_mtime_ns:
+        return gpd.read_parquet(GEO_CACHE_PATH)
+    return build_world(source)
@@ -0,0 +1,59 @@
+"""
+Точные порядковые статистики по группам с hash-партиционированием.
+
+1. Каждый процесс читает свой диапазон row group'ов и раскладывает строки
+   по shards файлам по хэшу ключа (все строки одного клиента попадают
+   в один shard).
+2. Каждый shard обрабатывается отдельным процессом обычным groupby,
+   поэтому медианы и квантили по группам точные.
+3. Результаты shard'ов склеиваются в одну Series, индексированную ключом.
+"""
+
+import os
+import tempfile
+import uuid
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.feather as feather
+
+from common.config import TRANSACTIONS_PATH
+from common.parallel import map_parallel, map_row_groups
+from common.trace import traced
+
+
+def _scatter(frame, key, shards, directory):
+    shard_ids = pd.util.hash_pandas_object(frame[key], index=False).to_numpy() % shards
+    part = uuid.uuid4().hex
+    for shard, piece in frame.groupby(shard_ids, sort=False):
+        shard_dir = Path(directory) / str(shard)
+        shard_dir.mkdir(exist_ok=True)
+        feather.write_feather(piece.reset_index(drop=True), shard_dir / f'{part}.arrow',
+                              compression='uncompressed')
+
+
+def _reduce(shard, key, value, how, directory):
+    shard_dir = Path(directory) / str(shard)
+    if not shard_dir.exists():
+        return None
+
+    frame = pd.concat([feather.read_feather(p) for p in shard_dir.iterdir()], ignore_index=True)
+    grouped = frame.groupby(key, observed=True)[value]
+    if isinstance(how, float):
+        return grouped.quantile(how)
+    return grouped.agg(how)
+
+
+@traced()
+def partitioned_groupby(key, value, how='median', shards=None, workers=None, path=TRANSACTIONS_PATH):
+    # how - 'median', 'min', 'max', другая агрегация pandas или квантиль (float от 0 до 1)
+    workers = workers or os.cpu_count()
+    shards = shards or workers
+
+    with tempfile.TemporaryDirectory() as directory:
+        map_row_groups(_scatter, [key, value], path, workers, args=(key, shards, directory))
+        parts = map_parallel(_reduce, range(shards), workers, args=(key, value, how, directory))
+
+    result = pd.concat([part for part in parts if part is not None]).sort_index()
+    result.name = value
+    return result
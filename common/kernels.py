@@ -0,0 +1,258 @@
+"""
+Агрегаты по группам через коды словаря и np.bincount.
+
+Почти все группировки в заданиях - по маленьким измерениям (страны, города,
+категории). Вместо хеширования строк колонка переводится в целые коды
+(у категориальных колонок загрузчика коды уже есть), несколько ключей -
+в один int64 ключ по смешанному основанию: код1 * размер2 + код2.
+Пока все возможные ключи помещаются в плотный массив, группа - это просто
+индекс в нем; иначе ключи сжимаются до номеров непустых групп (np.unique).
+Каждый агрегат - один проход bincount по строкам, результат - плотный
+массив длины size, top-k - argpartition по нему.
+
+    groups = Groups.from_frame(transactions, ['country'])
+    fraud = groups.count(where=transactions['is_fraud'].to_numpy(dtype=bool))
+    groups.top_k(fraud, 5)                      # 5 стран с наибольшим числом мошенничеств
+    groups.argmax(groups.mean(transactions['amount']))
+    groups.to_series(groups.rate(transactions['is_fraud']), 'fraud_rate')
+
+Выигрыш - на категориальных колонках (загрузка по умолчанию, FRAUD_COMPACT=1):
+строковую колонку сначала приходится кодировать pd.factorize с тем же
+хешированием, что и в groupby.
+Группы с пустым значением ключа отбрасываются, как в groupby.
+to_series, top_k и argmax учитывают только группы, встречающиеся в данных.
+Сравнение с pandas groupby (в том числе на ключах с пропусками):
+    python -m common.kernels
+"""
+
+import time
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+# Плотные ключи, пока их не больше стольких на строку (как в common.activity)
+DENSE_FACTOR = 4
+
+
+def codes(values):
+    # Коды >= 0 и категории; пропуски получают код -1
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy(), values.cat.categories
+    return pd.factorize(values, sort=True)
+
+
+def _narrow(size):
+    # Самый узкий знаковый тип, в который влезает ключ с двумя битами флагов
+    for dtype in (np.int8, np.int16, np.int32):
+        if 4 * size <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+class Groups:
+    def __init__(self, columns):
+        # columns: {имя ключа: Series}
+        self.names = list(columns)
+        self.levels = []
+        self._steps = []
+        n = len(next(iter(columns.values())))
+        limit = DENSE_FACTOR * n + 1024
+
+        key = None
+        valid = None
+        size = 1
+        for values in columns.values():
+            level_codes, categories = codes(values)
+            if (level_codes < 0).any():
+                missing = level_codes < 0
+                valid = ~missing if valid is None else valid & ~missing
+                level_codes = np.where(missing, 0, level_codes)
+            m = max(len(categories), 1)
+            key = level_codes if key is None else key.astype('int64') * m + level_codes
+            size *= m
+            uniq = None
+            if size > limit:
+                # Плотный массив был бы слишком велик - оставляем только встречающиеся ключи
+                uniq, key = np.unique(key if valid is None else np.where(valid, key, -1), return_inverse=True)
+                key = key.reshape(-1)
+                if len(uniq) and uniq[0] == -1:
+                    uniq, key = uniq[1:], key - 1
+                size = len(uniq)
+            self.levels.append(categories)
+            self._steps.append((m, uniq))
+
+        # Узкий тип ключа: меньше байт на строку в каждом проходе bincount
+        self._rows = valid
+        self.key = (key if valid is None else key[valid]).astype(_narrow(size), copy=False)
+        self.size = size
+
+    @classmethod
+    def from_frame(cls, frame, keys):
+        return cls({k: frame[k] for k in keys})
+
+    def _rows_of(self, values, dtype):
+        values = np.asarray(values, dtype=dtype)
+        return values if self._rows is None else values[self._rows]
+
+    def _split(self, flag, where=None):
+        # Флаг как лишний бит ключа: один bincount дает (строк с False, строк с True) по группам.
+        # where - еще один бит, строки вне него уходят в отброшенную половину
+        ways = 2 if where is None else 4
+        key = self.key * ways
+        key += self._rows_of(flag, bool)
+        if where is not None:
+            key += self._rows_of(where, bool) * self.key.dtype.type(2)
+        split = np.bincount(key, minlength=ways * self.size).reshape(self.size, ways)
+        if 'counts' not in self.__dict__:
+            # Попутно получаем размеры групп для to_series, top_k и argmax
+            self.counts = split.sum(axis=1)
+        return split[:, -2:]
+
+    @cached_property
+    def counts(self):
+        return np.bincount(self.key, minlength=self.size)
+
+    def count(self, where=None):
+        return self.counts if where is None else self._split(where)[:, 1]
+
+    def _weighted(self, values, where):
+        values = self._rows_of(values, 'float64')
+        # Как в pandas, пропуски не учитываются
+        present = ~np.isnan(values)
+        if where is not None:
+            present &= self._rows_of(where, bool)
+        total = np.bincount(self.key, weights=np.where(present, values, 0.0), minlength=self.size)
+        return total, present
+
+    def sum(self, values, where=None):
+        return self._weighted(values, where)[0]
+
+    def mean(self, values, where=None):
+        total, present = self._weighted(values, where)
+        # present уже отфильтрован по строкам с ключом - повторно через _split его не пропускаем
+        counts = self.counts if present.all() else np.bincount(self.key, weights=present, minlength=self.size)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return total / counts
+
+    def rate(self, flag, where=None):
+        # Доля True (например, мошенничества) в группе
+        split = self._split(flag, where)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return split[:, 1] / split.sum(axis=1)
+
+    def labels(self, ids):
+        # Номера групп -> значения ключей; шаги построения ключа разворачиваются в обратном порядке
+        ids = np.asarray(ids, dtype=np.intp)
+        level_codes = []
+        for m, uniq in reversed(self._steps):
+            if uniq is not None:
+                ids = uniq[ids]
+            level_codes.append(ids % m)
+            ids = ids // m
+        arrays = [level.take(c) for level, c in zip(self.levels, reversed(level_codes))]
+        if len(arrays) == 1:
+            return pd.Index(arrays[0], name=self.names[0])
+        return pd.MultiIndex.from_arrays(arrays, names=self.names)
+
+    def _observed(self, values):
+        values = np.asarray(values, dtype='float64')
+        return np.flatnonzero((self.counts > 0) & ~np.isnan(values)), values
+
+    def to_series(self, values, name=None):
+        ids = np.flatnonzero(self.counts > 0)
+        return pd.Series(np.asarray(values)[ids], index=self.labels(ids), name=name)
+
+    def top_k(self, values, k, ascending=False):
+        ids, values = self._observed(values)
+        order = values[ids] if ascending else -values[ids]
+        if k < len(ids):
+            part = np.argpartition(order, k - 1)[:k]
+            ids, order = ids[part], order[part]
+        # Среди равных - в порядке ключей, как после сортировки groupby
+        ids = ids[np.lexsort((ids, order))]
+        return pd.Series(values[ids], index=self.labels(ids))
+
+    def argmax(self, values):
+        ids, values = self._observed(values)
+        return self.labels(ids[[np.argmax(values[ids])]])[0]
+
+
+def check_missing(rows=10_000, seed=0):
+    # Сверка с pandas groupby на ключах с пропусками, NaN в значениях и where
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({
+        'a': pd.Categorical(rng.choice(['x', 'y', 'z', None], rows)),
+        'b': pd.Series(rng.choice(['p', 'q', None], rows), dtype=object),
+        'v': np.where(rng.random(rows) < 0.1, np.nan, rng.random(rows)),
+        'flag': rng.random(rows) < 0.3,
+    })
+    where = rng.random(rows) < 0.7
+    mismatches = []
+    for keys in (['a'], ['b'], ['a', 'b']):
+        groups = Groups.from_frame(frame, keys)
+        grouped = frame[where].groupby(keys, observed=True)
+        checks = {
+            'count': (groups.count(where=where), grouped.size()),
+            'sum': (groups.sum(frame['v'], where=where), grouped['v'].sum()),
+            'mean': (groups.mean(frame['v'], where=where), grouped['v'].mean()),
+            'rate': (groups.rate(frame['flag'], where=where), grouped['flag'].mean()),
+        }
+        for name, (values, expected) in checks.items():
+            result = groups.to_series(values).reindex(expected.index)
+            if not np.allclose(result.to_numpy(dtype='float64'), expected.to_numpy(dtype='float64')):
+                mismatches.append(f'{name} по {keys}')
+    return mismatches
+
+
+def _compare(transactions, repeat=3):
+    fraud = transactions['is_fraud'].to_numpy(dtype=bool)
+
+    def best(func):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func()
+            timings.append(time.perf_counter() - start)
+        return min(timings), result
+
+    cases = {
+        'top5_fraud_countries': (
+            lambda: transactions.loc[fraud, 'country'].value_counts().head(5).index.tolist(),
+            lambda: (lambda g: g.top_k(g.count(where=fraud), 5).index.tolist())(
+                Groups.from_frame(transactions, ['country'])),
+        ),
+        'city_max_mean_amount': (
+            lambda: transactions.groupby('city', observed=True)['amount'].mean().idxmax(),
+            lambda: (lambda g: g.argmax(g.mean(transactions['amount'])))(
+                Groups.from_frame(transactions, ['city'])),
+        ),
+        'fraud_rate_category_country': (
+            lambda: transactions.groupby(['vendor_category', 'country'], observed=True)['is_fraud'].mean().round(12),
+            lambda: (lambda g: g.to_series(g.rate(fraud), 'is_fraud').round(12))(
+                Groups.from_frame(transactions, ['vendor_category', 'country'])),
+        ),
+    }
+    report = []
+    for name, (reference, kernel) in cases.items():
+        pandas_s, expected = best(reference)
+        kernel_s, result = best(kernel)
+        if isinstance(expected, pd.Series):
+            # С FRAUD_ARROW_DTYPES=1 pandas отдает double[pyarrow], сверяем значения
+            same = expected.index.equals(result.index) and np.allclose(
+                expected.to_numpy(dtype='float64'), result.to_numpy(dtype='float64'), equal_nan=True)
+        else:
+            same = expected == result
+        report.append({'case': name, 'pandas_s': pandas_s, 'kernel_s': kernel_s,
+                       'speedup': pandas_s / kernel_s, 'same': bool(same)})
+    return pd.DataFrame(report)
+
+
+if __name__ == '__main__':
+    from common.loader import load_transactions
+
+    mismatches = check_missing()
+    print('Ключи с пропусками: ' + ('совпадает с pandas' if not mismatches else 'НЕВЕРНО: ' + ', '.join(mismatches)))
+
+    frame = load_transactions(columns=['country', 'city', 'vendor_category', 'is_fraud', 'amount'])
+    print(_compare(frame).round(4).to_string(index=False))
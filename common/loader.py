@@ -0,0 +1,153 @@
+"""
+Загрузка датасета с проекцией колонок и фильтрами.
+
+columns - список нужных колонок, остальные не декодируются.
+filters - условия в формате pyarrow, например [('is_fraud', '==', True)];
+они проверяются по статистикам row group'ов и отсекают лишние строки
+еще до конвертации в pandas.
+
+По умолчанию данные читаются из memory-mapped Arrow кэша (см. common.cache),
+cache=False (и hive-каталоги всегда) читает Parquet напрямую.
+
+Struct-колонка last_hour_activity разворачивается в плоские типизированные
+колонки last_hour_activity.num_transactions, last_hour_activity.unique_merchants
+и т.д. прямо из дочерних Arrow-массивов, без Python-словарей. В columns можно
+просить как всю структуру, так и отдельные поля через точку.
+
+compact=True (по умолчанию) оставляет строковые колонки из
+config.CATEGORICAL_COLUMNS словарными (в pandas - category) и сужает
+числовые типы там, где это не теряет значений.
+
+arrow_dtypes=True (FRAUD_ARROW_DTYPES=1) не конвертирует колонки в NumPy:
+строки, числа, время и структуры становятся pd.ArrowDtype и ссылаются
+на буферы Arrow (из кэша - прямо на memory-mapped файл), без копий и
+Python-объектов. Словарные колонки по-прежнему category. .dt, сравнения,
+groupby, merge и factorize на таких колонках возвращают Arrow-типы;
+isin и to_numpy дают NumPy, но без копии строк. Сравнение памяти:
+    python -m common.loader
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from common.cache import cached_table
+from common.config import (
+    TRANSACTIONS_PATH, EXCHANGE_RATES_PATH, USE_CACHE, COMPACT, ARROW_DTYPES, CATEGORICAL_COLUMNS
+)
+from common.trace import traced
+
+
+def _filter_columns(filters):
+    # filters бывают плоским списком условий или списком списков (ИЛИ из И)
+    if isinstance(filters[0], list):
+        filters = [condition for group in filters for condition in group]
+    return [condition[0] for condition in filters]
+
+
+def _source_columns(columns):
+    # 'last_hour_activity.unique_merchants' читается из колонки last_hour_activity
+    return list(dict.fromkeys(column.split('.', 1)[0] for column in columns))
+
+
+def _read_source(path, columns, filters, cache, compact):
+    # Кэш строится по одному файлу; hive-каталог (см. data_separation.py) читаем напрямую
+    if not cache or os.path.isdir(path):
+        names = ds.dataset(path, format='parquet', partitioning='hive').schema.names
+        dictionary_columns = [c for c in CATEGORICAL_COLUMNS if c in names] if compact else None
+        return pq.read_table(path, columns=columns, filters=filters, read_dictionary=dictionary_columns)
+
+    table = cached_table(path)
+    if filters:
+        if columns is not None:
+            table = table.select(list(dict.fromkeys(columns + _filter_columns(filters))))
+        table = table.filter(pq.filters_to_expression(filters))
+    if columns is not None:
+        table = table.select(columns)
+    if not compact:
+        # В кэше категориальные колонки словарные - раскрываем обратно в строки
+        for i, field in enumerate(table.schema):
+            if pa.types.is_dictionary(field.type):
+                table = table.set_column(i, field.name, table.column(i).cast(field.type.value_type))
+    return table
+
+
+def read_table(path, columns=None, filters=None, cache=USE_CACHE, flatten=True, compact=COMPACT):
+    source_columns = None if columns is None else _source_columns(columns)
+    table = _read_source(path, source_columns, filters, cache, compact)
+    if not flatten:
+        return table
+
+    # Table.flatten берет дочерние массивы структуры без копирования данных
+    table = table.flatten()
+    if columns is not None:
+        # dict.fromkeys: структура и ее поле через точку не дают дублей
+        table = table.select(list(dict.fromkeys(
+            name for column in columns
+            for name in table.column_names
+            if name == column or name.startswith(column + '.')
+        )))
+    return table
+
+
+def _arrow_dtype(arrow_type):
+    # Словарные колонки остаются category: их коды нужны groupby и common.kernels
+    return None if pa.types.is_dictionary(arrow_type) else pd.ArrowDtype(arrow_type)
+
+
+def to_pandas(table, arrow_dtypes=ARROW_DTYPES):
+    return table.to_pandas(types_mapper=_arrow_dtype) if arrow_dtypes else table.to_pandas()
+
+
+def downcast(frame):
+    for column in frame.columns:
+        series = frame[column]
+        if isinstance(series.dtype, pd.ArrowDtype):
+            # Сужение скопировало бы колонку из буфера Arrow в NumPy
+            continue
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # Категории из словаря Parquet идут в порядке появления; сортируем,
+            # чтобы groupby выдавал группы в том же порядке, что и для строк
+            frame[column] = series.cat.reorder_categories(series.cat.categories.sort_values())
+        elif pd.api.types.is_integer_dtype(series.dtype):
+            frame[column] = pd.to_numeric(series, downcast='integer')
+        elif pd.api.types.is_float_dtype(series.dtype):
+            # float32 только если все значения переживают перевод туда и обратно
+            narrow = series.to_numpy(dtype='float32')
+            if np.array_equal(narrow.astype('float64'), series.to_numpy(), equal_nan=True):
+                frame[column] = narrow
+    return frame
+
+
+@traced()
+def load_transactions(columns=None, filters=None, path=TRANSACTIONS_PATH, cache=USE_CACHE,
+                      flatten=True, compact=COMPACT, arrow_dtypes=ARROW_DTYPES):
+    frame = to_pandas(read_table(path, columns, filters, cache, flatten, compact), arrow_dtypes)
+    return downcast(frame) if compact else frame
+
+
+@traced()
+def load_exchange_rates(path=EXCHANGE_RATES_PATH, cache=USE_CACHE, arrow_dtypes=ARROW_DTYPES):
+    return to_pandas(read_table(path, cache=cache), arrow_dtypes)
+
+
+def memory_report(columns=None, path=TRANSACTIONS_PATH):
+    before = load_transactions(columns, path=path, compact=False, arrow_dtypes=False)
+    after = load_transactions(columns, path=path, compact=True, arrow_dtypes=False)
+    # Для ArrowDtype это размер буферов Arrow, а не новые выделения: из кэша они memory-mapped
+    arrow = load_transactions(columns, path=path, compact=True, arrow_dtypes=True)
+
+    report = pd.DataFrame({
+        name: frame.memory_usage(deep=True, index=False)
+        for name, frame in [('before_mb', before), ('after_mb', after), ('arrow_mb', arrow)]
+    }) / 2 ** 20
+    report.loc['total'] = report.sum()
+    return report.round(2)
+
+
+if __name__ == '__main__':
+    print(memory_report())
@@ -0,0 +1,81 @@
+"""
+Объединяемые аккумуляторы среднего, дисперсии, минимума и максимума.
+
+Moments по части данных считается двухпроходно (устойчиво), а части
+объединяются формулой Chan et al., поэтому итог по всем частям совпадает
+с расчетом pandas по всей колонке в пределах погрешности float.
+"""
+
+from functools import reduce
+
+import numpy as np
+
+from common.config import TRANSACTIONS_PATH
+from common.parallel import map_row_groups
+from common.trace import traced
+
+
+class Moments:
+    def __init__(self, count=0, mean=0.0, m2=0.0, minimum=np.inf, maximum=-np.inf):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        self.min = minimum
+        self.max = maximum
+
+    @classmethod
+    def from_values(cls, values):
+        values = np.asarray(values, dtype='float64')
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return cls()
+
+        mean = values.mean()
+        return cls(len(values), mean, ((values - mean) ** 2).sum(), values.min(), values.max())
+
+    @classmethod
+    def combine(cls, parts):
+        return reduce(cls.merge, parts, cls())
+
+    def merge(self, other):
+        count = self.count + other.count
+        if not count:
+            return Moments()
+
+        delta = other.mean - self.mean
+        mean = self.mean + delta * other.count / count
+        m2 = self.m2 + other.m2 + delta ** 2 * self.count * other.count / count
+        return Moments(count, mean, m2, min(self.min, other.min), max(self.max, other.max))
+
+    __add__ = merge
+
+    @property
+    def var(self):
+        # ddof=1, как в pandas
+        return self.m2 / (self.count - 1) if self.count > 1 else np.nan
+
+    @property
+    def std(self):
+        return np.sqrt(self.var)
+
+    def __repr__(self):
+        return (f'Moments(count={self.count}, mean={self.mean}, std={self.std}, '
+                f'min={self.min}, max={self.max})')
+
+
+def usd_moments(frame, rates):
+    amount_usd = rates.to_usd(frame['amount'], frame['currency'], frame['timestamp'])
+    fraud = frame['is_fraud'].to_numpy(dtype=bool)
+    return {
+        True: Moments.from_values(amount_usd[fraud]),
+        False: Moments.from_values(amount_usd[~fraud]),
+    }
+
+
+@traced()
+def usd_moments_by_fraud(rates, workers=None, path=TRANSACTIONS_PATH):
+    # Каждый процесс считает моменты сумм в USD по своему диапазону row group'ов
+    parts = map_row_groups(
+        usd_moments, ['amount', 'currency', 'timestamp', 'is_fraud'], path, workers, args=(rates,)
+    )
+    return {flag: Moments.combine(part[flag] for part in parts) for flag in (True, False)}
@@ -0,0 +1,209 @@
+"""
+Инкрементальный монитор доли мошенничества.
+
+Для каждого набора измерений (страна, категория, канал, страна x категория)
+хранятся накопленные меры count, fraud_count, amount_sum, fraud_amount_sum,
+как в кубе (common.cube). Новый файл транзакций агрегируется отдельно и
+прибавляется к состоянию, исправления вычитаются (retract). Стоимость
+обновления зависит от размера нового куска и числа групп, а не от объема
+истории.
+
+После каждого обновления для затронутых групп проверяется порог доли
+мошенничества (config.FRAUD_RATE_THRESHOLD, 20% как в data_separation.py);
+группы, перешедшие через порог в любую сторону, возвращаются как алерты.
+
+Состояние хранится в config.MONITOR_DIR: по Parquet на набор измерений и
+monitor.json с настройками и журналом примененных файлов. Учтен ли файл,
+решает сумма его записей в журнале (+1 за прибавление, -1 за вычитание):
+файл нельзя прибавить или вычесть дважды подряд, но после append и retract
+его можно прибавить снова.
+
+    python -m common.monitor ingest new_day.parquet
+    python -m common.monitor ingest corrections.parquet --retract
+    python -m common.monitor status --dimension country
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+import pandas as pd
+
+from common.cache import _write_atomic, file_hash
+from common.config import FRAUD_RATE_THRESHOLD, MONITOR_DIR
+from common.streaming import iter_frames
+from common.trace import traced
+
+DIMENSIONS = [('country',), ('vendor_category',), ('channel',), ('country', 'vendor_category')]
+MEASURES = ['count', 'fraud_count', 'amount_sum', 'fraud_amount_sum']
+
+# Группы с меньшим числом транзакций не порождают алертов
+MIN_COUNT = 100
+
+
+def _name(dimensions):
+    return '+'.join(dimensions)
+
+
+def _empty(dimensions):
+    index = pd.MultiIndex.from_arrays([[]] * len(dimensions), names=dimensions)
+    return pd.DataFrame({m: pd.Series(dtype='float64') for m in MEASURES}, index=index)
+
+
+def _rates(state):
+    return state['fraud_count'] / state['count'].where(state['count'] > 0)
+
+
+class FraudMonitor:
+    def __init__(self, dimensions=DIMENSIONS, threshold=FRAUD_RATE_THRESHOLD, min_count=MIN_COUNT):
+        self.dimensions = [tuple(d) for d in dimensions]
+        self.threshold = threshold
+        self.min_count = min_count
+        self.state = {d: _empty(d) for d in self.dimensions}
+        self.batches = []
+
+    @property
+    def columns(self):
+        return list(dict.fromkeys(c for d in self.dimensions for c in d)) + ['is_fraud', 'amount']
+
+    def aggregate(self, frames):
+        # Частичные меры нового куска по всем наборам измерений
+        partial = {d: None for d in self.dimensions}
+        for frame in frames:
+            frame = frame.assign(fraud_amount=frame['amount'].where(frame['is_fraud'], 0.0))
+            for d in self.dimensions:
+                grouped = frame.groupby(list(d), observed=True, sort=False).agg(
+                    count=('is_fraud', 'size'),
+                    fraud_count=('is_fraud', 'sum'),
+                    amount_sum=('amount', 'sum'),
+                    fraud_amount_sum=('fraud_amount', 'sum'),
+                ).astype('float64')
+                if not isinstance(grouped.index, pd.MultiIndex):
+                    grouped.index = pd.MultiIndex.from_arrays([grouped.index], names=d)
+                partial[d] = grouped if partial[d] is None else partial[d].add(grouped, fill_value=0)
+        return {d: p if p is not None else _empty(d) for d, p in partial.items()}
+
+    def _net(self, batch_id):
+        # Сколько раз кусок сейчас учтен: число '+id' минус число '-id' в журнале
+        return self.batches.count('+' + batch_id) - self.batches.count('-' + batch_id)
+
+    def _apply(self, partial, sign, batch_id):
+        # В журнале '+id' - прибавленный кусок, '-id' - вычтенный
+        entry = None if batch_id is None else ('+' if sign > 0 else '-') + batch_id
+        if entry is not None and self._net(batch_id) == sign:
+            raise ValueError(f"Кусок {batch_id} уже {'учтен' if sign > 0 else 'вычтен'}")
+
+        # Сначала считаем новое состояние целиком, чтобы ошибка не оставила его наполовину обновленным
+        updated, alerts = {}, []
+        for d in self.dimensions:
+            state = self.state[d]
+            touched = partial[d].index
+            before = state.reindex(touched).fillna(0)
+            after = before + sign * partial[d]
+            if (after['count'] < 0).any():
+                raise ValueError(f'Вычитание дает отрицательное число транзакций в {_name(d)}')
+
+            old_rate, new_rate = _rates(before), _rates(after)
+            # Алерт - переход через порог у группы, где после обновления достаточно транзакций
+            old_above = (old_rate >= self.threshold) & (before['count'] >= self.min_count)
+            new_above = new_rate >= self.threshold
+            changed = (old_above != new_above) & (after['count'] >= self.min_count)
+            for key in touched[changed]:
+                alerts.append({
+                    'dimensions': _name(d),
+                    'key': key if len(d) > 1 else key[0],
+                    'old_rate': old_rate[key],
+                    'new_rate': new_rate[key],
+                    'status': 'above' if new_above[key] else 'below',
+                })
+
+            state = pd.concat([state.drop(touched, errors='ignore'), after])
+            updated[d] = state[state['count'] > 0]
+
+        self.state = updated
+        if entry is not None:
+            self.batches.append(entry)
+        return alerts
+
+    def append(self, frame, batch_id=None):
+        return self._apply(self.aggregate([frame]), 1, batch_id)
+
+    def retract(self, frame, batch_id=None):
+        return self._apply(self.aggregate([frame]), -1, batch_id)
+
+    @traced()
+    def ingest(self, path, retract=False):
+        # Файл читается потоково, частичные меры копятся по кускам
+        partial = self.aggregate(iter_frames(self.columns, path=path))
+        return self._apply(partial, -1 if retract else 1, f'{Path(path).name}:{file_hash(path)[:16]}')
+
+    def rates(self, dimensions=('country',)):
+        dimensions = tuple([dimensions] if isinstance(dimensions, str) else dimensions)
+        state = self.state[dimensions]
+        result = state.assign(
+            count=state['count'].astype('int64'),
+            fraud_count=state['fraud_count'].astype('int64'),
+            fraud_rate=_rates(state),
+            avg_amount=state['amount_sum'] / state['count'],
+        )
+        result['above_threshold'] = (result['fraud_rate'] >= self.threshold) & (result['count'] >= self.min_count)
+        return result.reset_index().sort_values('fraud_rate', ascending=False, ignore_index=True)
+
+    def save(self, directory=MONITOR_DIR):
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for d, state in self.state.items():
+            _write_atomic(directory / f'{_name(d)}.parquet', lambda p, s=state: s.reset_index().to_parquet(p))
+        _write_atomic(directory / 'monitor.json', lambda p: p.write_text(json.dumps({
+            'dimensions': self.dimensions,
+            'threshold': self.threshold,
+            'min_count': self.min_count,
+            'batches': self.batches,
+        }, indent=2, ensure_ascii=False)))
+
+    @classmethod
+    def load(cls, directory=MONITOR_DIR):
+        directory = Path(directory)
+        meta_path = directory / 'monitor.json'
+        if not meta_path.exists():
+            return cls()
+
+        meta = json.loads(meta_path.read_text())
+        monitor = cls(meta['dimensions'], meta['threshold'], meta['min_count'])
+        monitor.batches = meta['batches']
+        for d in monitor.dimensions:
+            path = directory / f'{_name(d)}.parquet'
+            if path.exists():
+                state = pd.read_parquet(path)
+                # MultiIndex и для одного измерения, как у частичных агрегатов
+                state.index = pd.MultiIndex.from_frame(state[list(d)])
+                monitor.state[d] = state[MEASURES]
+        return monitor
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Инкрементальный монитор доли мошенничества')
+    parser.add_argument('--dir', type=Path, default=MONITOR_DIR, help='каталог состояния')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    ingest = commands.add_parser('ingest', help='учесть новые файлы транзакций')
+    ingest.add_argument('paths', nargs='+', type=Path)
+    ingest.add_argument('--retract', action='store_true', help='вычесть файлы (исправления)')
+
+    status = commands.add_parser('status', help='текущие доли мошенничества')
+    status.add_argument('--dimension', nargs='+', default=['country'])
+
+    args = parser.parse_args()
+    monitor = FraudMonitor.load(args.dir)
+
+    if args.command == 'ingest':
+        for path in args.paths:
+            alerts = monitor.ingest(path, retract=args.retract)
+            print(f"{'Вычтен' if args.retract else 'Учтен'} {path}")
+            for alert in alerts:
+                print(f"  {alert['dimensions']}={alert['key']}: {alert['old_rate']:.2%} -> "
+                      f"{alert['new_rate']:.2%} ({'выше' if alert['status'] == 'above' else 'ниже'} "
+                      f"порога {monitor.threshold:.0%})")
+        monitor.save(args.dir)
+    else:
+        print(monitor.rates(args.dimension).to_string(index=False))
@@ -0,0 +1,57 @@
+"""
+Параллельная обработка Parquet-файла по диапазонам row group'ов.
+
+Файл делится на непересекающиеся диапазоны row group'ов, каждый процесс
+сам читает и декодирует свой диапазон, применяет к нему функцию и
+возвращает небольшой частичный результат, который объединяется в
+родительском процессе.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pyarrow.parquet as pq
+
+from common.config import TRANSACTIONS_PATH
+from common.loader import _source_columns
+
+
+def _context():
+    # fork не переимпортирует запускающий скрипт в дочерних процессах,
+    # поэтому скрипты без if __name__ == '__main__' тоже работают
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return None
+
+
+def row_group_ranges(path, parts):
+    num_row_groups = pq.ParquetFile(path).num_row_groups
+    bounds = np.linspace(0, num_row_groups, min(parts, num_row_groups) + 1).astype(int)
+    return [range(start, stop) for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start]
+
+
+def read_row_groups(path, row_groups, columns=None):
+    source_columns = None if columns is None else _source_columns(columns)
+    table = pq.ParquetFile(path).read_row_groups(list(row_groups), columns=source_columns).flatten()
+    if columns is not None:
+        table = table.select(columns)
+    return table.to_pandas()
+
+
+def map_parallel(func, items, workers=None, args=()):
+    workers = workers or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=_context()) as pool:
+        futures = [pool.submit(func, item, *args) for item in items]
+        return [future.result() for future in futures]
+
+
+def _run_part(row_groups, func, path, columns, args):
+    return func(read_row_groups(path, row_groups, columns), *args)
+
+
+def map_row_groups(func, columns=None, path=TRANSACTIONS_PATH, workers=None, args=()):
+    workers = workers or os.cpu_count()
+    parts = row_group_ranges(path, workers)
+    return map_parallel(_run_part, parts, workers, args=(func, str(path), columns, args))
@@ -0,0 +1,203 @@
+"""
+Пакетная отрисовка всех графиков без GUI.
+
+Каждый скрипт с графиками запускается в отдельном процессе пула с бэкендом
+Agg. plt.show() не открывает окно, а сохраняет открытые фигуры в
+free_analysis/img/<скрипт>_<n>.png/.svg, а фигуры из README_FIGURES - под
+именами, на которые ссылается README.md (Figure_N); plt.savefig(имя) пишет
+файл с тем же именем в free_analysis/img/. Figure_9 и image-3/4 в README не
+строятся ни одним скриптом и остаются статичными файлами.
+
+Скрипт пропускается, если не изменились ни он сам, ни модули common, которые
+он импортирует (в том числе косвенно), ни его входные данные (размер и mtime
+файлов); состояние хранится в img/render_state.json. Общие кэши (куб,
+геоданные) строятся один раз в родительском процессе до запуска пула.
+
+    python -m common.render              # все задания
+    python -m common.render cls corr2    # только выбранные
+    python -m common.render --force      # перерисовать все
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import runpy
+import sys
+import traceback
+from pathlib import Path
+
+from common.config import (
+    EXCHANGE_RATES_PATH, IMG_DIR, RISK_SPLIT_PATH, ROOT_DIR, TRANSACTIONS_PATH
+)
+from common.parallel import map_parallel
+
+FORMATS = ('png', 'svg')
+STATE_PATH = IMG_DIR / 'render_state.json'
+
+GEODATA = ROOT_DIR / 'free_analysis' / 'geodata' / 'ne_110m_admin_0_countries.zip'
+
+# Имя задания -> (скрипт, входные данные)
+JOBS = {
+    'base_map': ('free_analysis/base_map.py', [TRANSACTIONS_PATH, GEODATA]),
+    'base_map_2': ('free_analysis/base_map_2.py', [TRANSACTIONS_PATH, GEODATA]),
+    'cls': ('free_analysis/cls.py', [TRANSACTIONS_PATH]),
+    'corr2': ('free_analysis/corr2.py', [TRANSACTIONS_PATH]),
+    'corr_test': ('free_analysis/corr_test.py', [TRANSACTIONS_PATH]),
+    'scatter': ('free_analysis/scatter.py', [RISK_SPLIT_PATH]),
+    'timedata': ('free_analysis/timedata.py', [TRANSACTIONS_PATH]),
+    'task_10': ('data_analysis/base_tasks/task_10.py', [TRANSACTIONS_PATH, EXCHANGE_RATES_PATH]),
+}
+
+# (задание, номер фигуры в plt.show) -> имя картинки в README.md
+README_FIGURES = {
+    ('timedata', 1): 'Figure_11',
+    ('corr2', 1): 'Figure_10',
+    ('corr_test', 2): 'Figure_2',   # vendor_type
+    ('corr_test', 3): 'Figure_4',   # is_card_present
+    ('corr_test', 4): 'Figure_5',   # channel
+    ('corr_test', 5): 'Figure_6',   # is_outside_home_country
+    ('corr_test', 6): 'Figure_7',   # is_high_risk_vendor
+    ('corr_test', 7): 'Figure_8',   # is_weekend
+}
+
+
+def _stat_key(path):
+    # Для каталога (hive-датасет) учитываются все файлы внутри
+    if os.path.isdir(path):
+        return sorted(
+            (os.path.relpath(os.path.join(root, name), path), _stat_key(os.path.join(root, name)))
+            for root, _, names in os.walk(path) for name in names
+        )
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+_COMMON_IMPORT = re.compile(r'^\s*(?:from|import)\s+common\.(\w+)|^\s*from\s+common\s+import\s+([\w, ]+)', re.M)
+
+
+def common_modules(path):
+    # Модули common, импортируемые файлом напрямую и через другие модули common
+    modules, pending = set(), [Path(path)]
+    while pending:
+        for match in _COMMON_IMPORT.finditer(pending.pop().read_text(encoding='utf-8')):
+            names = [match.group(1)] if match.group(1) else [n.strip() for n in match.group(2).split(',')]
+            for module in names:
+                source = ROOT_DIR / 'common' / f'{module}.py'
+                if module and module not in modules and source.exists():
+                    modules.add(module)
+                    pending.append(source)
+    return sorted(modules)
+
+
+def job_hash(name):
+    script, inputs = JOBS[name]
+    digest = hashlib.sha256((ROOT_DIR / script).read_bytes())
+    for module in common_modules(ROOT_DIR / script):
+        digest.update((ROOT_DIR / 'common' / f'{module}.py').read_bytes())
+    digest.update(json.dumps([_stat_key(str(path)) for path in inputs]).encode())
+    return digest.hexdigest()
+
+
+def prepare_shared(names):
+    # Куб и геоданные строятся до пула: иначе каждый процесс с устаревшим кэшем
+    # пересобирал бы его сам и писал в тот же файл
+    modules = {m for name in names for m in common_modules(ROOT_DIR / JOBS[name][0])}
+    if 'cube' in modules:
+        from common.cube import load_cube
+        load_cube()
+    if 'geodata' in modules:
+        from common.geodata import load_world
+        load_world()
+
+
+def render_job(name):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from matplotlib.figure import Figure
+
+    script = ROOT_DIR / JOBS[name][0]
+    save_original = Figure.savefig
+    saved = set()
+    counter = [0]
+
+    def save(figure, stem, *args, **kwargs):
+        for fmt in FORMATS:
+            save_original(figure, IMG_DIR / f'{stem}.{fmt}', *args, **kwargs)
+
+    def savefig(self, fname, *args, **kwargs):
+        # Имя из скрипта сохраняется, каталог подменяется на img/
+        if not isinstance(fname, (str, os.PathLike)):
+            return save_original(self, fname, *args, **kwargs)
+        saved.add(id(self))
+        save(self, os.path.splitext(os.path.basename(fname))[0], *args, **kwargs)
+
+    def show(*args, **kwargs):
+        for number in plt.get_fignums():
+            figure = plt.figure(number)
+            if id(figure) not in saved:
+                counter[0] += 1
+                stem = README_FIGURES.get((name, counter[0]), f'{name}_{counter[0]}')
+                save(figure, stem, dpi=150, bbox_inches='tight')
+        plt.close('all')
+
+    Figure.savefig = savefig
+    plt.show = show
+
+    cwd, argv = os.getcwd(), sys.argv
+    try:
+        os.chdir(script.parent)
+        sys.argv = [str(script)]
+        runpy.run_path(str(script), run_name='__main__')
+        show()
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            return name, f'ошибка: exit({e.code})'
+        show()
+    except Exception:
+        return name, 'ошибка:\n' + traceback.format_exc()
+    finally:
+        os.chdir(cwd)
+        sys.argv = argv
+        Figure.savefig = save_original
+        plt.close('all')
+    return name, 'готово'
+
+
+def render(names=None, force=False, workers=None):
+    names = list(names or JOBS)
+    IMG_DIR.mkdir(parents=True, exist_ok=True)
+    state = json.loads(STATE_PATH.read_text()) if STATE_PATH.exists() else {}
+
+    hashes = {name: job_hash(name) for name in names}
+    todo = [name for name in names if force or state.get(name) != hashes[name]]
+    if todo:
+        prepare_shared(todo)
+    results = dict(map_parallel(render_job, todo, workers)) if todo else {}
+
+    for name in names:
+        status = results.get(name, 'без изменений, пропущено')
+        if status == 'готово':
+            state[name] = hashes[name]
+        print(f'{name:<12} {status}')
+
+    STATE_PATH.write_text(json.dumps(state, indent=2))
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Пакетная отрисовка графиков в free_analysis/img')
+    parser.add_argument('jobs', nargs='*', help=f"задания (по умолчанию все): {', '.join(JOBS)}")
+    parser.add_argument('--force', action='store_true', help='перерисовать даже без изменений')
+    parser.add_argument('--workers', type=int, default=None, help='число процессов')
+    args = parser.parse_args()
+
+    unknown = set(args.jobs) - set(JOBS)
+    if unknown:
+        parser.error(f"неизвестные задания: {', '.join(sorted(unknown))}")
+
+    render(args.jobs, args.force, args.workers)
@@ -0,0 +1,272 @@
+"""
+Сервер запросов с данными в памяти.
+
+Транзакции и курсы загружаются один раз, дальше именованные запросы
+(базовые задания, доли мошенничества по измерениям, перцентили) отвечают
+из памяти за миллисекунды. Сервер говорит HTTP на localhost или на
+Unix-сокете, запросы обслуживает пул потоков.
+
+    python main.py serve [--port 8765 | --socket /tmp/fraud.sock]
+    python main.py query task_7
+    python main.py query fraud_rates dimension=country
+    python main.py query percentile column=amount_usd q=0.5,0.95 fraud=true
+
+HTTP: GET /queries - список запросов, GET /query/<имя>?параметр=значение.
+Ответ - JSON {"query", "params", "result", "elapsed_ms"}, клиент - common.client.
+Ctrl+C и SIGTERM останавливают сервер штатно, файл Unix-сокета удаляется.
+"""
+
+import json
+import math
+import os
+import signal
+import socketserver
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from common.config import SERVER_HOST, SERVER_PORT
+from common.currency import RateTable
+from common.kernels import Groups
+from common.loader import load_exchange_rates, load_transactions
+from common.sketches import make_sketch
+from common.trace import stage
+from data_analysis.base_tasks.run_all import TASKS, Shared
+
+# Измерения, по которым доступны доли мошенничества
+DIMENSIONS = ['country', 'vendor_category', 'vendor_type', 'channel', 'card_type', 'device', 'city_size']
+
+QUERIES = {}
+
+
+def query(name):
+    def register(func):
+        QUERIES[name] = func
+        return func
+    return register
+
+
+def _flag(value):
+    return str(value).lower() in ('1', 'true', 'yes')
+
+
+def _jsonable(value):
+    if isinstance(value, pd.DataFrame):
+        return [{k: _jsonable(v) for k, v in row.items()} for row in value.to_dict('records')]
+    if isinstance(value, pd.Series):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (np.integer, np.bool_)):
+        return value.item()
+    if isinstance(value, (float, np.floating)):
+        return None if math.isnan(value) else float(value)
+    return value
+
+
+class QueryService:
+    def __init__(self):
+        self.tasks = {task.__name__: task for task in TASKS}
+        columns = list(dict.fromkeys(
+            [c for task_columns in TASKS.values() for c in task_columns] + DIMENSIONS + ['last_hour_activity']
+        ))
+        with stage('server.load'):
+            self.shared = Shared(load_transactions(columns=columns), RateTable.from_frame(load_exchange_rates()))
+            # Прогрев общих промежуточных результатов до первого запроса
+            self.shared.fraud, self.shared.amount_usd, self.shared.known_city
+        self._answers = {}
+        self._sketches = {}
+        self._lock = threading.Lock()
+
+    @property
+    def transactions(self):
+        return self.shared.transactions
+
+    def run(self, name, params):
+        if name not in QUERIES:
+            raise KeyError(name)
+        return QUERIES[name](self, **params)
+
+
+@query('queries')
+def _queries(service):
+    return sorted(QUERIES) + sorted(service.tasks)
+
+
+@query('task')
+def _task(service, name):
+    if name not in service.tasks:
+        raise ValueError(f"Неизвестное задание '{name}'")
+    # Ответы заданий не меняются, считаем каждый один раз
+    with service._lock:
+        cached = name in service._answers
+    if not cached:
+        answer = service.tasks[name](service.shared)
+        with service._lock:
+            service._answers[name] = answer
+    return service._answers[name]
+
+
+@query('tasks')
+def _tasks(service):
+    return {name: _task(service, name) for name in service.tasks}
+
+
+@query('fraud_rates')
+def _fraud_rates(service, dimension='country'):
+    dimensions = dimension.split(',')
+    unknown = [d for d in dimensions if d not in DIMENSIONS]
+    if unknown:
+        raise ValueError(f'Неизвестные измерения {unknown}, доступны {DIMENSIONS}')
+
+    t = service.transactions
+    groups = Groups.from_frame(t, dimensions)
+    fraud = groups.count(where=service.shared.fraud)
+    stats = pd.DataFrame({
+        'total': groups.to_series(groups.counts),
+        'fraud': groups.to_series(fraud),
+        'avg_amount': groups.to_series(groups.mean(t['amount'])),
+    })
+    stats['fraud_rate'] = stats['fraud'] / stats['total']
+    return stats.reset_index().sort_values('fraud_rate', ascending=False)
+
+
+@query('percentile')
+def _percentile(service, column='amount_usd', q='0.5', fraud=None):
+    t = service.transactions
+    if column == 'amount_usd':
+        values = service.shared.amount_usd
+    elif column in t and pd.api.types.is_numeric_dtype(t[column]):
+        values = t[column]
+    else:
+        raise ValueError(f"Колонка '{column}' не числовая или не загружена")
+
+    qs = [float(x) for x in q.split(',')]
+    # Скетч (t-digest или точный при FRAUD_EXACT_QUANTILES=1) строится один раз
+    # на колонку и срез, дальше квантили отвечают без сортировки колонки
+    key = (column, None if fraud is None else _flag(fraud))
+    with service._lock:
+        sketch = service._sketches.get(key)
+    if sketch is None:
+        if fraud is not None:
+            values = values[service.shared.fraud == key[1]]
+        sketch = make_sketch().update(values.to_numpy(dtype='float64'))
+        with service._lock:
+            service._sketches[key] = sketch
+    return dict(zip(map(str, qs), sketch.quantile(qs)))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    service = None
+
+    def _reply(self, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = dict(parse_qsl(url.query))
+        parts = [p for p in url.path.split('/') if p]
+        if parts == ['queries']:
+            parts = ['query', 'queries']
+        if len(parts) != 2 or parts[0] != 'query':
+            return self._reply(404, {'error': f'Неизвестный путь {url.path}'})
+
+        name = parts[1]
+        # task_7 -> task(name='task_7')
+        if name in self.service.tasks:
+            name, params = 'task', {'name': name}
+
+        # Имя проверяем до вызова: KeyError изнутри запроса - это ошибка запроса, а не 404
+        if name not in QUERIES:
+            return self._reply(404, {'error': f"Неизвестный запрос '{name}'"})
+
+        start = time.perf_counter()
+        try:
+            result = self.service.run(name, params)
+        except (TypeError, ValueError) as e:
+            return self._reply(400, {'error': str(e)})
+        except Exception as e:
+            # Иначе handle_error закрыл бы соединение без ответа
+            return self._reply(500, {'error': f'{type(e).__name__}: {e}'})
+        self._reply(200, {
+            'query': name, 'params': params, 'result': _jsonable(result),
+            'elapsed_ms': (time.perf_counter() - start) * 1000,
+        })
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _PoolMixIn:
+    # Как ThreadingMixIn, но потоки из фиксированного пула
+    workers = os.cpu_count()
+
+    def process_request(self, request, client_address):
+        self._pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_activate(self):
+        self._pool = ThreadPoolExecutor(max_workers=self.workers)
+        super().server_activate()
+
+    def server_close(self):
+        super().server_close()
+        self._pool.shutdown(wait=True)
+
+
+class PoolHTTPServer(_PoolMixIn, HTTPServer):
+    pass
+
+
+class PoolUnixHTTPServer(_PoolMixIn, socketserver.UnixStreamServer):
+    def get_request(self):
+        request, _ = super().get_request()
+        # У Unix-сокета нет адреса клиента, а BaseHTTPRequestHandler ждет пару
+        return request, ('local', 0)
+
+
+def serve(port=SERVER_PORT, socket_path=None, workers=None):
+    start = time.perf_counter()
+    handler = type('Handler', (_Handler,), {'service': QueryService()})
+    print(f'Данные загружены за {time.perf_counter() - start:.1f} с')
+
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server_class, address, where = PoolUnixHTTPServer, socket_path, socket_path
+    else:
+        server_class, address, where = PoolHTTPServer, (SERVER_HOST, port), f'http://{SERVER_HOST}:{port}'
+    server_class = type(server_class.__name__, (server_class,), {'workers': workers or os.cpu_count()})
+
+    with server_class(address, handler) as server:
+        print(f'Сервер запросов слушает {where}')
+        previous = None
+        if threading.current_thread() is threading.main_thread():
+            # shutdown() ждет выхода из serve_forever в этом же потоке - вызываем его из другого
+            previous = signal.signal(
+                signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown).start()
+            )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if previous is not None:
+                signal.signal(signal.SIGTERM, previous)
+            if socket_path and os.path.exists(socket_path):
+                os.unlink(socket_path)
@@ -0,0 +1,158 @@
+"""
+Потоковая агрегация по record batch'ам Parquet-файла.
+
+Файл читается кусками по batch_size строк, для каждого куска считаются
+частичные агрегаты по группам (count, sum, M2, min, max), которые сразу
+сливаются с накопленными. Пиковая память определяется размером куска
+и числом групп, а не размером датасета.
+
+Спецификация агрегатов как в pandas named aggregation:
+    stream_aggregate(['country'], {
+        'total_transactions': ('is_fraud', 'count'),
+        'fraud_transactions': ('is_fraud', 'sum'),
+        'avg_amount': ('amount', 'mean'),
+    })
+Поддерживаются count, sum, mean, min, max, var и std (ddof=1).
+"""
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from common.config import TRANSACTIONS_PATH
+from common.loader import _filter_columns, _source_columns
+from common.trace import traced
+
+# Какие частичные статистики нужны для каждого агрегата
+STATS = {
+    'count': (),
+    'sum': ('sum',),
+    'mean': ('sum',),
+    'var': ('sum', 'm2'),
+    'std': ('sum', 'm2'),
+    'min': ('min',),
+    'max': ('max',),
+}
+
+BATCH_SIZE = 500_000
+
+
+def iter_frames(columns=None, filters=None, path=TRANSACTIONS_PATH, batch_size=BATCH_SIZE):
+    source_columns = None if columns is None else _source_columns(columns)
+    if filters and source_columns is not None:
+        source_columns = list(dict.fromkeys(source_columns + _filter_columns(filters)))
+
+    dataset = ds.dataset(path, format='parquet')
+    expression = pq.filters_to_expression(filters) if filters else None
+    for batch in dataset.to_batches(columns=source_columns, filter=expression, batch_size=batch_size):
+        table = pa.Table.from_batches([batch]).flatten()
+        if columns is not None:
+            table = table.select(columns)
+        yield table.to_pandas()
+
+
+def _combine(a, b):
+    if a is None:
+        return b
+
+    index = a['count'].index.union(b['count'].index)
+    a = {stat: frame.reindex(index) for stat, frame in a.items()}
+    b = {stat: frame.reindex(index) for stat, frame in b.items()}
+
+    n_a, n_b = a['count'].fillna(0), b['count'].fillna(0)
+    combined = {'count': n_a + n_b}
+    if 'sum' in a:
+        combined['sum'] = a['sum'].fillna(0) + b['sum'].fillna(0)
+    if 'm2' in a:
+        # Объединение дисперсий по Chan et al.: M2 = M2_a + M2_b + delta^2 * n_a * n_b / n
+        columns = a['m2'].columns
+        n_a, n_b = n_a[columns], n_b[columns]
+        mean_a = a['sum'][columns].fillna(0) / n_a.where(n_a > 0)
+        mean_b = b['sum'][columns].fillna(0) / n_b.where(n_b > 0)
+        delta = (mean_b - mean_a).fillna(0)
+        n = (n_a + n_b).where(n_a + n_b > 0)
+        combined['m2'] = a['m2'].fillna(0) + b['m2'].fillna(0) + (delta ** 2 * n_a * n_b / n).fillna(0)
+    if 'min' in a:
+        combined['min'] = a['min'].combine(b['min'], np.fmin)
+    if 'max' in a:
+        combined['max'] = a['max'].combine(b['max'], np.fmax)
+    return combined
+
+
+class GroupAggregator:
+    def __init__(self, keys, aggs):
+        self.keys = list(keys)
+        self.aggs = aggs
+        for column, how in aggs.values():
+            if how not in STATS:
+                raise ValueError(f"Неподдерживаемая агрегация '{how}' для колонки '{column}'")
+
+        # stat -> колонки, для которых ее нужно считать
+        self.stat_columns = {'count': list(dict.fromkeys(column for column, _ in aggs.values()))}
+        for column, how in aggs.values():
+            for stat in STATS[how]:
+                columns = self.stat_columns.setdefault(stat, [])
+                if column not in columns:
+                    columns.append(column)
+        self.state = None
+
+    @property
+    def columns(self):
+        return list(dict.fromkeys(self.keys + self.stat_columns['count']))
+
+    def update(self, frame):
+        # Без ключей все строки попадают в одну группу 0; константный массив,
+        # а не функция - ее pandas вызывал бы для каждой строки
+        by = self.keys or np.zeros(len(frame), dtype='int8')
+        grouped = frame.groupby(by, observed=True, sort=False)
+
+        partial = {'count': grouped[self.stat_columns['count']].count()}
+        if 'sum' in self.stat_columns:
+            partial['sum'] = grouped[self.stat_columns['sum']].sum()
+        if 'm2' in self.stat_columns:
+            columns = self.stat_columns['m2']
+            partial['m2'] = grouped[columns].var(ddof=0) * partial['count'][columns]
+        if 'min' in self.stat_columns:
+            partial['min'] = grouped[self.stat_columns['min']].min()
+        if 'max' in self.stat_columns:
+            partial['max'] = grouped[self.stat_columns['max']].max()
+
+        self.state = _combine(self.state, partial)
+
+    def result(self):
+        count = self.state['count']
+        result = {}
+        for name, (column, how) in self.aggs.items():
+            if how == 'count':
+                result[name] = count[column].astype('int64')
+            elif how == 'sum':
+                result[name] = self.state['sum'][column]
+            elif how == 'mean':
+                result[name] = self.state['sum'][column] / count[column]
+            elif how in ('var', 'std'):
+                var = self.state['m2'][column] / (count[column] - 1).where(count[column] > 1)
+                result[name] = np.sqrt(var) if how == 'std' else var
+            else:
+                result[name] = self.state[how][column]
+
+        result = pd.DataFrame(result)
+        if not self.keys:
+            return result.reset_index(drop=True)
+        return result.sort_index()
+
+
+@traced()
+def stream_aggregate(keys, aggs, columns=None, filters=None, path=TRANSACTIONS_PATH,
+                     batch_size=BATCH_SIZE, prepare=None):
+    # prepare(frame) добавляет в кусок производные колонки (дату, группу стран и т.п.);
+    # в этом случае исходные колонки для чтения передаются через columns
+    aggregator = GroupAggregator(keys, aggs)
+    columns = columns or aggregator.columns
+
+    for frame in iter_frames(columns, filters, path, batch_size):
+        if prepare is not None:
+            frame = prepare(frame)
+        aggregator.update(frame)
+    return aggregator.result()
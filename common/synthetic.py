@@ -0,0 +1,308 @@
+"""
+Генератор синтетического датасета той же схемы, что и настоящий.
+
+Пишет transaction_fraud_data.parquet (включая структуру last_hour_activity)
+и historical_currency_exchange.parquet с теми же колонками валют, чтобы
+скрипты можно было запускать и нагружать без исходных данных.
+
+Структура повторяет описанную в README: 12 стран, один месяц транзакций,
+доля мошенничества около 37% в Mexico, Russia, Brazil и Nigeria и около 7%
+в остальных странах, равномерная по категориям, типам карт и каналам.
+Суммы генерируются в USD и переводятся в валюту страны по сгенерированному
+курсу на дату транзакции.
+
+Строки генерируются кусками по CHUNK_ROWS. Каждый кусок покрывает свой
+отрезок времени и получает собственный генератор, зависящий только от seed
+и номера куска, поэтому результат не зависит от числа процессов, а
+timestamp по файлу отсортирован. Куски считаются в пуле процессов и
+записываются по порядку; в памяти одновременно не больше 2 * workers кусков.
+
+    python -m common.synthetic --rows 7500000 --data-dir /tmp/fraud
+"""
+
+import argparse
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from common.config import DATA_DIR
+from common.parallel import _context
+
+CHUNK_ROWS = 1 << 20
+ROW_GROUP_SIZE = 1 << 17
+
+START = pd.Timestamp('2024-09-30')
+DAYS = 31
+
+# Страна: (валюта, число транзакций в исходном датасете, доля мошенничества)
+COUNTRIES = {
+    'Australia': ('AUD', 496_695, 0.0758),
+    'Brazil': ('BRL', 804_800, 0.3711),
+    'Canada': ('CAD', 532_632, 0.0700),
+    'France': ('EUR', 565_000, 0.0700),
+    'Germany': ('EUR', 524_464, 0.0709),
+    'Japan': ('JPY', 527_393, 0.0713),
+    'Mexico': ('MXN', 785_704, 0.3803),
+    'Nigeria': ('NGN', 849_840, 0.3514),
+    'Russia': ('RUB', 793_730, 0.3772),
+    'Singapore': ('SGD', 565_000, 0.0700),
+    'UK': ('GBP', 538_493, 0.0694),
+    'USA': ('USD', 500_060, 0.0746),
+}
+
+# Курс за 1 USD на начало периода
+BASE_RATES = {
+    'AUD': 1.48, 'BRL': 5.45, 'CAD': 1.35, 'EUR': 0.90, 'GBP': 0.75, 'JPY': 144.0,
+    'MXN': 19.6, 'NGN': 1650.0, 'RUB': 93.0, 'SGD': 1.30, 'USD': 1.0,
+}
+
+VENDOR_TYPES = {
+    'Education': ['online', 'supplies'],
+    'Entertainment': ['events', 'gaming', 'streaming'],
+    'Gas': ['local', 'major'],
+    'Grocery': ['online', 'physical'],
+    'Healthcare': ['medical', 'pharmacy'],
+    'Restaurant': ['casual', 'fast_food', 'premium'],
+    'Retail': ['online', 'physical'],
+    'Travel': ['airlines', 'booking', 'hotels'],
+}
+HIGH_RISK_VENDOR_TYPES = {'online', 'gaming', 'booking', 'airlines'}
+VENDORS_PER_TYPE = 20
+
+# Устройство -> канал; оплата картой на месте только через pos
+DEVICES = {
+    'Chrome': 'web', 'Edge': 'web', 'Firefox': 'web', 'Safari': 'web',
+    'Android App': 'mobile', 'iOS App': 'mobile',
+    'Chip Reader': 'pos', 'Magnetic Stripe': 'pos', 'NFC Payment': 'pos',
+}
+CARD_TYPES = ['Basic Credit', 'Basic Debit', 'Gold Credit', 'Platinum Credit', 'Premium Debit']
+CITIES_PER_COUNTRY = 10
+CITY_SIZES = ['medium', 'large']
+
+ACTIVITY_TYPE = pa.struct([
+    ('num_transactions', pa.int64()),
+    ('total_amount', pa.float64()),
+    ('unique_merchants', pa.int64()),
+    ('unique_countries', pa.int64()),
+    ('max_single_amount', pa.float64()),
+])
+
+SCHEMA = pa.schema([
+    ('transaction_id', pa.string()),
+    ('customer_id', pa.string()),
+    ('card_number', pa.int64()),
+    ('timestamp', pa.timestamp('us')),
+    ('vendor_category', pa.string()),
+    ('vendor_type', pa.string()),
+    ('vendor', pa.string()),
+    ('amount', pa.float64()),
+    ('currency', pa.string()),
+    ('country', pa.string()),
+    ('city', pa.string()),
+    ('city_size', pa.string()),
+    ('card_type', pa.string()),
+    ('is_card_present', pa.bool_()),
+    ('device', pa.string()),
+    ('channel', pa.string()),
+    ('device_fingerprint', pa.string()),
+    ('ip_address', pa.string()),
+    ('is_outside_home_country', pa.bool_()),
+    ('is_high_risk_vendor', pa.bool_()),
+    ('is_weekend', pa.bool_()),
+    ('last_hour_activity', ACTIVITY_TYPE),
+    ('is_fraud', pa.bool_()),
+])
+
+_HEX = np.frombuffer(b'0123456789abcdef', dtype='S1')
+
+
+def _hex(values, width):
+    # Векторный '%0{width}x' через таблицу символов, без Python-строк
+    shifts = np.arange(width - 1, -1, -1, dtype=np.uint64) * 4
+    digits = (values.astype(np.uint64)[:, None] >> shifts) & 15
+    return _HEX[digits].view(f'S{width}').ravel()
+
+
+def _strings(values):
+    return pa.array(values).cast(pa.string())
+
+
+def _prefixed(prefix, values):
+    return pc.binary_join_element_wise(prefix, _strings(values), '')
+
+
+def _take(pool, indices):
+    # Строковая колонка из небольшого словаря значений по индексам
+    return pa.array(pool, pa.string()).take(pa.array(indices))
+
+
+def generate_rates(seed=0):
+    rng = np.random.default_rng([seed, 0])
+    dates = pd.date_range(START, periods=DAYS, freq='D')
+    columns = {'date': pa.array(dates.date, pa.date32())}
+    for code, base in BASE_RATES.items():
+        # Случайное блуждание курса с дневной волатильностью ~0.5%
+        walk = np.exp(np.cumsum(rng.normal(0, 0.005, DAYS))) if code != 'USD' else np.ones(DAYS)
+        columns[code] = pa.array(base * walk)
+    return pa.table(columns)
+
+
+def _customers(count, seed):
+    rng = np.random.default_rng([seed, 1])
+    countries = list(COUNTRIES)
+    weights = np.array([COUNTRIES[c][1] for c in countries], dtype=float)
+    return {
+        'country': rng.choice(len(countries), count, p=weights / weights.sum()),
+        'card_number': rng.integers(4 * 10 ** 15, 6 * 10 ** 15, count),
+        'card_type': rng.integers(0, len(CARD_TYPES), count),
+        'ip': rng.integers(0, 2 ** 32, count, dtype=np.uint64),
+    }
+
+
+def _chunk(index, start_row, rows, total_rows, seed, customers, rates):
+    rng = np.random.default_rng([seed, 2, index])
+    countries = list(COUNTRIES)
+    currencies = list(BASE_RATES)
+    n_customers = len(customers['country'])
+
+    # Кусок покрывает свою долю периода, поэтому время растет по всему файлу
+    span = DAYS * 86_400 * 10 ** 6
+    lo, hi = start_row * span // total_rows, (start_row + rows) * span // total_rows
+    micros = np.sort(rng.integers(lo, max(hi, lo + 1), rows))
+    timestamp = START.to_datetime64().astype('datetime64[us]') + micros.astype('timedelta64[us]')
+    day = micros // (86_400 * 10 ** 6)
+    is_weekend = (START.dayofweek + day) % 7 >= 5
+
+    customer = rng.integers(0, n_customers, rows)
+    home = customers['country'][customer]
+
+    # Страна транзакции: в половине случаев - не домашняя страна клиента
+    weights = np.array([COUNTRIES[c][1] for c in countries], dtype=float)
+    is_outside = rng.random(rows) < 0.5
+    country = np.where(is_outside, rng.choice(len(countries), rows, p=weights / weights.sum()), home)
+    is_outside = country != home
+
+    fraud_rate = np.array([COUNTRIES[c][2] for c in countries])
+    is_fraud = rng.random(rows) < fraud_rate[country]
+
+    currency_codes = np.array([currencies.index(COUNTRIES[c][0]) for c in countries])
+    currency = currency_codes[country]
+
+    # Сумма в USD (у мошеннических операций хвост тяжелее) -> в валюту страны
+    amount_usd = rng.lognormal(np.where(is_fraud, 6.0, 5.0), np.where(is_fraud, 1.6, 1.3))
+    amount = np.round(amount_usd * rates[np.minimum(day, DAYS - 1), currency], 2)
+
+    categories = list(VENDOR_TYPES)
+    types = sorted({t for values in VENDOR_TYPES.values() for t in values})
+    category = rng.integers(0, len(categories), rows)
+    type_options = np.array([
+        [types.index(VENDOR_TYPES[c][i % len(VENDOR_TYPES[c])]) for i in range(6)] for c in categories
+    ])
+    vendor_type = type_options[category, rng.integers(0, 6, rows)]
+    vendor_pool = [f'{c} {t} {k:02d}'.title() for c in categories for t in types for k in range(VENDORS_PER_TYPE)]
+    vendor = (category * len(types) + vendor_type) * VENDORS_PER_TYPE + rng.integers(0, VENDORS_PER_TYPE, rows)
+    is_high_risk_vendor = np.isin(vendor_type, [types.index(t) for t in HIGH_RISK_VENDOR_TYPES])
+
+    city_pool = [f'{c} City {k}' for c in countries for k in range(CITIES_PER_COUNTRY)] + ['Unknown City']
+    city = np.where(
+        rng.random(rows) < 0.1, len(city_pool) - 1,
+        country * CITIES_PER_COUNTRY + rng.integers(0, CITIES_PER_COUNTRY, rows)
+    )
+    city_size = np.where(city % CITIES_PER_COUNTRY < 3, 1, 0)
+
+    devices = list(DEVICES)
+    channels = sorted(set(DEVICES.values()))
+    device = rng.integers(0, len(devices), rows)
+    channel = np.array([channels.index(DEVICES[d]) for d in devices])[device]
+    is_card_present = channel == channels.index('pos')
+
+    ip = customers['ip'][customer] ^ (is_outside.astype(np.uint64) * rng.integers(1, 256, rows, dtype=np.uint64))
+    octets = [(ip >> np.uint64(shift)) & np.uint64(255) for shift in (24, 16, 8, 0)]
+    ip_address = pc.binary_join_element_wise(*[_strings(octet) for octet in octets], '.')
+
+    # Активность за последний час: у мошенников выше и разнообразнее
+    num_transactions = rng.poisson(np.where(is_fraud, 40, 10)) + 1
+    unique_merchants = rng.binomial(num_transactions, np.where(is_fraud, 0.8, 0.5)).clip(1)
+    unique_countries = 1 + rng.binomial(unique_merchants - 1, np.where(is_fraud, 0.3, 0.05))
+    max_single_amount = amount_usd * rng.uniform(1.0, 3.0, rows)
+    total_amount = max_single_amount * (1 + rng.uniform(0.2, 0.9, rows) * (num_transactions - 1))
+    activity = pa.StructArray.from_arrays(
+        [pa.array(num_transactions), pa.array(total_amount), pa.array(unique_merchants),
+         pa.array(unique_countries), pa.array(max_single_amount)],
+        fields=list(ACTIVITY_TYPE)
+    )
+
+    return pa.Table.from_arrays([
+        _prefixed('TX_', _hex(start_row + np.arange(rows), 8)),
+        _prefixed('CUST_', customer),
+        pa.array(customers['card_number'][customer]),
+        pa.array(timestamp),
+        _take(categories, category),
+        _take(types, vendor_type),
+        _take(vendor_pool, vendor),
+        pa.array(amount),
+        _take(currencies, currency),
+        _take(countries, country),
+        _take(city_pool, city),
+        _take(CITY_SIZES, city_size),
+        _take(CARD_TYPES, customers['card_type'][customer]),
+        pa.array(is_card_present),
+        _take(devices, device),
+        _take(channels, channel),
+        _strings(_hex(customer * len(devices) + device, 16)),
+        ip_address,
+        pa.array(is_outside),
+        pa.array(is_high_risk_vendor),
+        pa.array(is_weekend),
+        activity,
+        pa.array(is_fraud),
+    ], schema=SCHEMA)
+
+
+def generate(rows, data_dir=DATA_DIR, seed=0, workers=None, customers=None):
+    data_dir = Path(data_dir)
+    data_dir.mkdir(parents=True, exist_ok=True)
+    workers = workers or os.cpu_count()
+    # Около 1500 транзакций на клиента, как в исходном датасете
+    customers = _customers(customers or max(1, rows // 1500), seed)
+
+    rates_table = generate_rates(seed)
+    pq.write_table(rates_table, data_dir / 'historical_currency_exchange.parquet')
+    rates = np.column_stack([rates_table[code].to_numpy() for code in BASE_RATES])
+
+    starts = range(0, rows, CHUNK_ROWS)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=_context()) as pool, \
+            pq.ParquetWriter(data_dir / 'transaction_fraud_data.parquet', SCHEMA) as writer:
+        pending = deque()
+        for index, start in enumerate(starts):
+            pending.append(pool.submit(
+                _chunk, index, start, min(CHUNK_ROWS, rows - start), rows, seed, customers, rates
+            ))
+            if len(pending) >= 2 * workers:
+                writer.write_table(pending.popleft().result(), row_group_size=ROW_GROUP_SIZE)
+        while pending:
+            writer.write_table(pending.popleft().result(), row_group_size=ROW_GROUP_SIZE)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Синтетический датасет транзакций')
+    parser.add_argument('--rows', type=int, default=7_500_000)
+    parser.add_argument('--data-dir', type=Path, default=DATA_DIR)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--customers', type=int, default=None)
+    parser.add_argument('--force', action='store_true', help='перезаписать существующие файлы')
+    args = parser.parse_args()
+
+    target = args.data_dir / 'transaction_fraud_data.parquet'
+    if target.exists() and not args.force:
+        parser.error(f'{target} уже существует, для перезаписи укажите --force')
+    generate(args.rows, args.data_dir, args.seed, args.workers, args.customers)
+    print(f'{args.rows} строк записано в {args.data_dir}')
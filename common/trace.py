@@ -0,0 +1,229 @@
+"""
+Замеры по этапам: время, CPU, строки на входе и выходе, пик памяти.
+
+Включается переменной окружения FRAUD_TRACE=<файл.json или каталог/>;
+FRAUD_TRACE_MEMORY=1 дополнительно считает пик Python-аллокаций через
+tracemalloc (заметно замедляет работу). Без FRAUD_TRACE декоратор traced
+возвращает функцию без изменений, а stage() - общий пустой контекст,
+поэтому хуки можно оставлять в коде.
+
+    with stage('merge', rows_in=len(df)) as s:
+        merged = ...
+        s.rows_out = len(merged)
+
+    @traced()
+    def load_transactions(...): ...
+
+Этапы вкладываются друг в друга. Пик RSS этапа - максимум VmHWM, который
+сбрасывается на входе в этап через /proc/self/clear_refs (Linux); пик
+дочернего этапа учитывается и в родительском. Этапы внутри воркеров
+пулов процессов не записываются, их время входит в этап-родитель.
+
+При завершении процесса пишутся JSON со всеми этапами, рядом файл .folded
+со свернутыми стеками (для flamegraph.pl и speedscope), а в stderr
+печатается дерево этапов с долями времени.
+"""
+
+import atexit
+import json
+import os
+import sys
+import time
+import tracemalloc
+from functools import wraps
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from common.config import TRACE_PATH, TRACE_MEMORY
+
+ENABLED = TRACE_PATH is not None
+
+_stack = []
+_records = []
+_CLEAR_REFS = Path('/proc/self/clear_refs')
+_STATUS = Path('/proc/self/status')
+
+
+def _rows(value):
+    if isinstance(value, (pd.DataFrame, pd.Series, np.ndarray, pa.Table, pa.RecordBatch)):
+        return len(value)
+    return None
+
+
+def _rss_peak_mb():
+    if not _STATUS.exists():
+        return None
+    for line in _STATUS.read_text().splitlines():
+        if line.startswith('VmHWM:'):
+            return int(line.split()[1]) / 1024
+    return None
+
+
+def _reset_peaks():
+    try:
+        # '5' сбрасывает VmHWM до текущего RSS
+        _CLEAR_REFS.write_text('5')
+    except OSError:
+        pass
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+
+
+class Stage:
+    def __init__(self, name, rows_in=None):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+
+    def _fold_peaks(self):
+        rss = _rss_peak_mb()
+        if rss is not None:
+            self.peak_rss_mb = max(self.peak_rss_mb or 0, rss)
+        if tracemalloc.is_tracing():
+            self.peak_traced_mb = max(self.peak_traced_mb or 0, tracemalloc.get_traced_memory()[1] / 2 ** 20)
+
+    def __enter__(self):
+        parent = _stack[-1] if _stack else None
+        self.path = (parent.path if parent else ()) + (self.name,)
+        if parent:
+            # Пик родителя до этого момента, пока счетчики не сброшены
+            parent._fold_peaks()
+        self.peak_rss_mb = self.peak_traced_mb = None
+        _reset_peaks()
+        _stack.append(self)
+        self.start = time.time()
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        return self
+
+    def __exit__(self, *exc):
+        wall = time.perf_counter() - self._wall
+        cpu = time.process_time() - self._cpu
+        self._fold_peaks()
+        _stack.pop()
+        if _stack:
+            parent = _stack[-1]
+            parent.peak_rss_mb = max(parent.peak_rss_mb or 0, self.peak_rss_mb or 0) or None
+            parent.peak_traced_mb = max(parent.peak_traced_mb or 0, self.peak_traced_mb or 0) or None
+        _records.append({
+            'name': self.name,
+            'path': ';'.join(self.path),
+            'start': self.start,
+            'wall_s': wall,
+            'cpu_s': cpu,
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out,
+            'peak_rss_mb': self.peak_rss_mb,
+            'peak_traced_mb': self.peak_traced_mb,
+            'error': exc[0].__name__ if exc[0] else None,
+        })
+        return False
+
+
+class _NullStage:
+    rows_in = rows_out = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL = _NullStage()
+
+
+def stage(name, rows_in=None):
+    if not ENABLED:
+        return _NULL
+    return Stage(name, rows_in)
+
+
+def traced(name=None):
+    def decorate(func):
+        if not ENABLED:
+            return func
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with Stage(name or func.__qualname__, _rows(args[0]) if args else None) as s:
+                result = func(*args, **kwargs)
+                s.rows_out = _rows(result)
+            return result
+        return wrapper
+    return decorate
+
+
+def summary(records=None):
+    records = _records if records is None else records
+    if not records:
+        return ''
+    frame = pd.DataFrame(records)
+    tree = frame.groupby('path', sort=False).agg(
+        calls=('wall_s', 'size'), wall_s=('wall_s', 'sum'), cpu_s=('cpu_s', 'sum'),
+        rows_in=('rows_in', 'sum'), rows_out=('rows_out', 'sum'), peak_rss_mb=('peak_rss_mb', 'max')
+    )
+    total = frame.loc[~frame['path'].str.contains(';'), 'wall_s'].sum()
+
+    lines = [f"{'Этап':<48} {'Вызовы':>6} {'Время, с':>9} {'CPU, с':>8} {'%':>6} "
+             f"{'Строк вх.':>11} {'Строк вых.':>11} {'Пик RSS, МБ':>11}"]
+    # Родитель записывается позже детей: упорядочиваем по времени начала
+    # каждого предка, тогда дети идут сразу под родителем в порядке запуска
+    first_start = frame.groupby('path', sort=False)['start'].min()
+    order = sorted(tree.index, key=lambda p: [
+        first_start.get(';'.join(p.split(';')[:i + 1]), 0) for i in range(p.count(';') + 1)
+    ])
+    for path in order:
+        row = tree.loc[path]
+        depth = path.count(';')
+        share = row['wall_s'] / total if total else 0
+        label = '  ' * depth + path.rsplit(';', 1)[-1]
+        bar = '█' * round(share * 20)
+        rows_in = f"{int(row['rows_in']):,}" if row['rows_in'] else ''
+        rows_out = f"{int(row['rows_out']):,}" if row['rows_out'] else ''
+        peak = f"{row['peak_rss_mb']:.0f}" if pd.notna(row['peak_rss_mb']) else ''
+        lines.append(f"{label[:48]:<48} {int(row['calls']):>6} {row['wall_s']:>9.3f} {row['cpu_s']:>8.3f} "
+                     f"{share:>6.1%} {rows_in:>11} {rows_out:>11} {peak:>11} {bar}")
+    return '\n'.join(lines)
+
+
+def folded(records=None):
+    # Свернутые стеки: путь и собственное время этапа (без детей) в микросекундах
+    records = _records if records is None else records
+    self_time = {}
+    for r in records:
+        self_time[r['path']] = self_time.get(r['path'], 0) + r['wall_s']
+        if ';' in r['path']:
+            parent = r['path'].rsplit(';', 1)[0]
+            self_time[parent] = self_time.get(parent, 0) - r['wall_s']
+    return '\n'.join(f'{path} {max(round(t * 1e6), 0)}' for path, t in self_time.items())
+
+
+def _output_path():
+    path = Path(TRACE_PATH)
+    if TRACE_PATH.endswith(os.sep) or path.is_dir():
+        path = path / f"{Path(sys.argv[0]).stem or 'trace'}.json"
+    return path
+
+
+def write(path=None):
+    if not _records:
+        return
+    path = Path(path) if path else _output_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({
+        'argv': sys.argv, 'pid': os.getpid(), 'tracemalloc': tracemalloc.is_tracing(), 'stages': _records,
+    }, indent=2, ensure_ascii=False))
+    path.with_suffix('.folded').write_text(folded() + '\n')
+    print(f'\nТрасса этапов: {path}\n{summary()}', file=sys.stderr)
+
+
+if ENABLED:
+    if TRACE_MEMORY:
+        tracemalloc.start()
+    _main_pid = os.getpid()
+    # В дочерних процессах (fork) atexit не срабатывает, но проверяем на всякий случай
+    atexit.register(lambda: write() if os.getpid() == _main_pid else None)
@@ -0,0 +1,141 @@
+"""
+Ответы на все базовые задания (task_1 - task_11) за одно чтение датасета.
+
+Колонки всех заданий объединяются в один список и читаются один раз,
+общие промежуточные результаты (разбиение по is_fraud, пересчет в USD)
+вычисляются при первом обращении и переиспользуются.
+Время общего шага засчитывается заданию, которое обратилось к нему первым.
+"""
+
+import sys
+import math
+import time
+from functools import cached_property
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from common.activity import ActivityHistogram
+from common.currency import RateTable
+from common.kernels import Groups
+from common.loader import load_exchange_rates, load_transactions
+from common.trace import stage
+
+
+class Shared:
+    def __init__(self, transactions, rates):
+        self.transactions = transactions
+        self.rates = rates
+
+    @cached_property
+    def fraud(self):
+        return self.transactions['is_fraud'].to_numpy(dtype=bool)
+
+    @cached_property
+    def amount_usd(self):
+        t = self.transactions
+        return pd.Series(self.rates.to_usd(t['amount'], t['currency'], t['timestamp']), index=t.index)
+
+    @cached_property
+    def known_city(self):
+        return (self.transactions['city'] != 'Unknown City').to_numpy()
+
+    @cached_property
+    def cities(self):
+        return Groups.from_frame(self.transactions, ['city'])
+
+
+def task_1(s):
+    return math.ceil(s.fraud.mean() * 10) / 10
+
+
+def task_2(s):
+    countries = Groups.from_frame(s.transactions, ['country'])
+    return ",".join(countries.top_k(countries.count(where=s.fraud), 5).index)
+
+
+def task_3(s):
+    high_risk = s.transactions['is_high_risk_vendor'].to_numpy(dtype=bool)
+    return math.ceil(s.fraud[high_risk].mean() * 10) / 10
+
+
+def task_4(s):
+    activity = ActivityHistogram.from_frame(s.transactions, freq='h')
+    return math.ceil(activity.mean_per_bucket() * 100) / 100
+
+
+def task_5(s):
+    return s.cities.argmax(s.cities.mean(s.transactions['amount'], where=s.known_city))
+
+
+def task_6(s):
+    fast_food = s.known_city & (s.transactions['vendor_type'] == 'fast_food')
+    return s.cities.argmax(s.cities.mean(s.transactions['amount'], where=fast_food))
+
+
+def task_7(s):
+    return math.ceil(s.amount_usd[~s.fraud].mean())
+
+
+def task_8(s):
+    return math.ceil(s.amount_usd[~s.fraud].std())
+
+
+def task_9(s):
+    return math.ceil(s.amount_usd[s.fraud].mean())
+
+
+def task_10(s):
+    return math.ceil(s.amount_usd[s.fraud].std())
+
+
+def task_11(s):
+    t = s.transactions
+    median_per_customer = t.groupby('customer_id', observed=True)['last_hour_activity.unique_merchants'].median()
+    quantile_95 = median_per_customer.quantile(0.95)
+    return int((median_per_customer > quantile_95).sum())
+
+
+# Задание -> колонки, которые ему нужны
+TASKS = {
+    task_1: ['is_fraud'],
+    task_2: ['is_fraud', 'country'],
+    task_3: ['is_fraud', 'is_high_risk_vendor'],
+    task_4: ['customer_id', 'timestamp'],
+    task_5: ['city', 'amount'],
+    task_6: ['city', 'vendor_type', 'amount'],
+    task_7: ['is_fraud', 'amount', 'currency', 'timestamp'],
+    task_8: ['is_fraud', 'amount', 'currency', 'timestamp'],
+    task_9: ['is_fraud', 'amount', 'currency', 'timestamp'],
+    task_10: ['is_fraud', 'amount', 'currency', 'timestamp'],
+    task_11: ['customer_id', 'last_hour_activity.unique_merchants'],
+}
+
+
+def run(tasks=TASKS):
+    columns = list(dict.fromkeys(c for task_columns in tasks.values() for c in task_columns))
+
+    start = time.perf_counter()
+    with stage('scan') as s:
+        shared = Shared(load_transactions(columns=columns), RateTable.from_frame(load_exchange_rates()))
+        s.rows_out = len(shared.transactions)
+    timings = {'scan': time.perf_counter() - start}
+
+    answers = {}
+    for task in tasks:
+        start = time.perf_counter()
+        with stage(task.__name__, rows_in=len(shared.transactions)):
+            answers[task.__name__] = task(shared)
+        timings[task.__name__] = time.perf_counter() - start
+    return answers, timings
+
+
+if __name__ == '__main__':
+    answers, timings = run()
+
+    print(f"{'Задание':<10} {'Ответ':<45} {'Время, с':>9}")
+    print(f"{'scan':<10} {'':<45} {timings['scan']:>9.3f}")
+    for name, answer in answers.items():
+        print(f"{name:<10} {str(answer):<45} {timings[name]:>9.3f}")
+    print(f"{'total':<10} {'':<45} {sum(timings.values()):>9.3f}")
@@ -3,10 +3,14 @@
 Округлите до 1 знака после запятой вверх и напишите через точку, например 0.5
 """
 
-import pandas as pd
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from common.loader import load_transactions
 
 # Загрузка данных
-transactions = pd.read_parquet('../../free_analysis/src/transaction_fraud_data.parquet')
+transactions = load_transactions(columns=['is_fraud'])
 
 # Расчет доли
 total_transactions = len(transactions)
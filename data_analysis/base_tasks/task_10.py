@@ -3,49 +3,61 @@
 Округлите ответ до целых значений вверх, например 105
 """
 
-import pandas as pd
+import sys
+from pathlib import Path
+
 import matplotlib.pyplot as plt
 import seaborn as sns
 import math
 
-# Загрузка данных
-transactions = pd.read_parquet('../../free_analysis/src/transaction_fraud_data.parquet')
-exchange_rates = pd.read_parquet('../../free_analysis/src/historical_currency_exchange.parquet')
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from common.currency import RateTable
+from common.distribution import DistributionSummary
+from common.loader import load_exchange_rates, load_transactions
 
-# Фильтрация мошеннических операций
-fraud_trans = transactions[transactions['is_fraud']].copy()
+# Загрузка данных
+fraud_trans = load_transactions(
+    columns=['amount', 'currency', 'timestamp'],
+    filters=[('is_fraud', '==', True)]
+)
+rates = RateTable.from_frame(load_exchange_rates())
 
-# Добавление даты и объединение с курсами
-fraud_trans['date'] = fraud_trans['timestamp'].dt.date
-merged = fraud_trans.merge(exchange_rates, on='date', how='left')
+# Конвертация в USD по курсу на дату транзакции
+amount_usd = rates.to_usd(fraud_trans['amount'], fraud_trans['currency'], fraud_trans['timestamp'])
 
-# Конвертация в USD
-merged['amount_usd'] = merged.apply(
-    lambda row: row['amount'] / row[row['currency']] if row['currency'] != 'USD' else row['amount'],
-    axis=1
-)
+# Гистограмма, KDE и моменты за один векторный проход (KDE через FFT по сетке бинов)
+summary = DistributionSummary.from_values(amount_usd, bins=50)
 
 # Настройка стиля графиков
 sns.set(style="whitegrid")
 plt.figure(figsize=(12, 6))
 
-# Построение гистограммы и KDE
-ax = sns.histplot(merged['amount_usd'], bins=50, kde=True, color='crimson', alpha=0.7)
+# Построение гистограммы и KDE по предпосчитанным бинам
+ax = plt.gca()
+ax.hist(summary.edges[:-1], bins=summary.edges, weights=summary.counts, color='crimson', alpha=0.7)
+grid, kde = summary.kde_counts()
+ax.plot(grid, kde, color='crimson', linewidth=2)
 plt.title('Распределение сумм мошеннических операций (USD)', fontsize=14)
 plt.xlabel('Сумма в USD', fontsize=12)
 plt.ylabel('Количество операций', fontsize=12)
 
 # Добавление линии среднего и аннотации
-mean_val = merged['amount_usd'].mean()
+mean_val = summary.moments.mean
 plt.axvline(mean_val, color='navy', linestyle='--', linewidth=2)
 plt.text(mean_val*1.05, ax.get_ylim()[1]*0.9,
          f'Среднее: ${mean_val:.2f}', color='navy', fontsize=12)
 
 # Вывод стандартного отклонения (округленного вверх)
-std_usd = math.ceil(merged['amount_usd'].std())
+std_usd = math.ceil(summary.moments.std)
 plt.text(mean_val*1.05, ax.get_ylim()[1]*0.8,
          f'Станд. отклонение: ${std_usd}', color='darkgreen', fontsize=12)
 
+# Медиана и 95-й процентиль из потокового скетча (t-digest; FRAUD_EXACT_QUANTILES=1 - точно)
+median_val, p95_val = summary.quantiles.quantile([0.5, 0.95])
+for value, label, color in [(median_val, 'Медиана', 'darkorange'), (p95_val, '95-й процентиль', 'purple')]:
+    plt.axvline(value, color=color, linestyle=':', linewidth=2, label=f'{label}: ${value:.2f}')
+plt.legend(loc='upper right')
+
 # Логарифмическая шкала (если данные сильно скошены)
 plt.yscale('log')  # Раскомментируйте, если нужно
 
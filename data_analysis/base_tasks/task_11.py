@@ -3,17 +3,15 @@
 В ответе напишите единственное целое число — количество таких клиентов.
 """
 
-import pandas as pd
-import numpy as np
+import sys
+from pathlib import Path
 
-# Загрузка данных
-transactions = pd.read_parquet('../../free_analysis/src/transaction_fraud_data.parquet')
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from common.groupby import partitioned_groupby
 
-# Извлечение количества уникальных продавцов за последний час
-transactions['unique_merchants'] = transactions['last_hour_activity'].apply(lambda x: x['unique_merchants'])
-
-# Расчет медианного значения unique_merchants для каждого клиента
-median_per_customer = transactions.groupby('customer_id')['unique_merchants'].median()
+# Медианное значение unique_merchants для каждого клиента:
+# строки раскладываются по shard'ам по хэшу customer_id, медианы считаются параллельно
+median_per_customer = partitioned_groupby('customer_id', 'last_hour_activity.unique_merchants', 'median')
 
 # Вычисление 95-го квантиля по всем клиентам
 quantile_95 = median_per_customer.quantile(0.95)
@@ -3,14 +3,20 @@
 Ответ должен быть в формате строки с перечислением стран через запятую без пробелов. Пример:
 Brazil,UK,Japan,Australia,Nigeria
 """
-import pandas as pd
+
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from common.backend import aggregate, load, to_pandas, top_k
 
 # Загрузка данных
-transactions = pd.read_parquet('../../free_analysis/src/transaction_fraud_data.parquet')
+fraud_trans = load(columns=['country', 'is_fraud'], filters=[('is_fraud', '==', True)])
 
-# Фильтрация и подсчет
-fraud_by_country = transactions[transactions['is_fraud']].groupby('country').size()
-top_5_countries = fraud_by_country.sort_values(ascending=False).head(5).index.tolist()
+# Подсчет по странам и топ-5 (движок - config.BACKEND)
+stats = aggregate(fraud_trans, ['country'], {'fraud': ('is_fraud', 'count')})
+top_5_countries = to_pandas(top_k(stats, 'fraud', 5))['country'].tolist()
+fraud_by_country = to_pandas(stats).set_index('country')['fraud']
 
 # Форматирование ответа
 result = ",".join(top_5_countries)
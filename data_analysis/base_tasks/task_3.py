@@ -3,14 +3,16 @@
 Округлите до 1 знака после запятой вверх и напишите через точку, например 0.5
 """
 
-import pandas as pd
+import sys
+from pathlib import Path
+
 import math
 
-# Загрузка данных
-transactions = pd.read_parquet('../../free_analysis/src/transaction_fraud_data.parquet')
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from common.loader import load_transactions
 
-# Фильтрация высокорисковых продавцов
-high_risk_trans = transactions[transactions['is_high_risk_vendor']]
+# Загрузка данных
+high_risk_trans = load_transactions(columns=['is_fraud'], filters=[('is_high_risk_vendor', '==', True)])
 
 # Расчет доли
 total_high_risk = len(high_risk_trans)
@@ -5,20 +5,23 @@
 ПРОВЕРИТЬ!!!
 """
 
-import pandas as pd
+import sys
+from pathlib import Path
+
 import math
 
-# Загрузка данных
-transactions = pd.read_parquet('../../free_analysis/src/transaction_fraud_data.parquet')
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from common.activity import ActivityHistogram
+from common.loader import load_transactions
 
-# Добавляем столбец с часом
-transactions['hour'] = transactions['timestamp'].dt.hour
+# Загрузка данных
+transactions = load_transactions(columns=['customer_id', 'timestamp'])
 
-# Группируем по клиенту и часу, считаем транзакции
-trans_per_hour = transactions.groupby(['customer_id', 'hour'])['transaction_id'].count()
+# Число транзакций по парам (клиент, час от эпохи): 14:00 разных дней - разные часы
+activity = ActivityHistogram.from_frame(transactions, freq='h')
 
-# Вычисляем среднее значение
-avg_trans = trans_per_hour.mean()
+# Вычисляем среднее значение по часам, когда клиент был активен
+avg_trans = activity.mean_per_bucket()
 
 # Округление вверх до 2 знаков
 rounded_avg = math.ceil(avg_trans * 100) / 100
@@ -3,18 +3,22 @@
 Для ответа напишите название города как в датасете.
 """
 
-import pandas as pd
+import sys
+from pathlib import Path
 
-# Загрузка данных
-transactions = pd.read_parquet('../../free_analysis/src/transaction_fraud_data.parquet')
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from common.backend import aggregate, load, to_pandas, top_k
 
-# Фильтрация: исключаем 'Unknown City'
-filtered_transactions = transactions[transactions['city'] != 'Unknown City']
+# Загрузка данных
+filtered_transactions = load(
+    columns=['city', 'amount'],
+    filters=[('city', '!=', 'Unknown City')]
+)
 
-# Расчет средней суммы по городам
-avg_amount_by_city = filtered_transactions.groupby('city')['amount'].mean()
+# Расчет средней суммы по городам (движок - config.BACKEND)
+avg_amount_by_city = aggregate(filtered_transactions, ['city'], {'avg': ('amount', 'mean')})
 
 # Город с максимальной средней суммой
-city_with_max_avg = avg_amount_by_city.idxmax()
+city_with_max_avg = to_pandas(top_k(avg_amount_by_city, 'avg', 1))['city'].iloc[0]
 
 print(f"Город с наибольшей средней суммой транзакций: {city_with_max_avg}")
@@ -3,21 +3,22 @@
 Для ответа напишите название города как в датасете.
 """
 
-import pandas as pd
+import sys
+from pathlib import Path
 
-# Загрузка данных
-transactions = pd.read_parquet('../../free_analysis/src/transaction_fraud_data.parquet')
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from common.backend import aggregate, load, to_pandas, top_k
 
-# Фильтрация fast_food и исключение Unknown City
-fast_food_trans = transactions[
-    (transactions['vendor_type'] == 'fast_food') &
-    (transactions['city'] != 'Unknown City')
-]
+# Загрузка данных
+fast_food_trans = load(
+    columns=['city', 'amount'],
+    filters=[('vendor_type', '==', 'fast_food'), ('city', '!=', 'Unknown City')]
+)
 
-# Расчет среднего чека по городам
-avg_fast_food = fast_food_trans.groupby('city')['amount'].mean()
+# Расчет среднего чека по городам (движок - config.BACKEND)
+avg_fast_food = aggregate(fast_food_trans, ['city'], {'avg': ('amount', 'mean')})
 
 # Город с максимальным средним чеком
-city_max_avg = avg_fast_food.idxmax()
+city_max_avg = to_pandas(top_k(avg_fast_food, 'avg', 1))['city'].iloc[0]
 
 print(f"Город с самым высоким средним чеком в fast_food: {city_max_avg}")
@@ -3,30 +3,24 @@
 Округлите ответ до целых значений вверх, например 105
 """
 
-import pandas as pd
-import math
-
-# Загрузка данных
-transactions = pd.read_parquet('../../free_analysis/src/transaction_fraud_data.parquet')
-exchange_rates = pd.read_parquet('../../free_analysis/src/historical_currency_exchange.parquet')
+import sys
+from pathlib import Path
 
-# Фильтрация немошеннических операций
-legit_trans = transactions[transactions['is_fraud'] == False]
+import math
 
-# Добавляем дату для объединения
-legit_trans['date'] = legit_trans['timestamp'].dt.date
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from common.currency import RateTable
+from common.loader import load_exchange_rates
+from common.moments import usd_moments_by_fraud
 
-# Объединяем с курсами валют
-merged = legit_trans.merge(exchange_rates, on='date', how='left')
+# Загрузка курсов валют
+rates = RateTable.from_frame(load_exchange_rates())
 
-# Конвертация в USD (если валюта не USD)
-merged['amount_usd'] = merged.apply(
-    lambda row: row['amount'] / row[row['currency']] if row['currency'] != 'USD' else row['amount'],
-    axis=1
-)
+# Конвертация в USD и расчет моментов параллельно по частям файла
+moments = usd_moments_by_fraud(rates)[False]
 
 # Расчет среднего и округление вверх
-avg_amount_usd = merged['amount_usd'].mean()
+avg_amount_usd = moments.mean
 rounded_avg = math.ceil(avg_amount_usd)
 
 print(f"Средняя сумма немошеннических операций в USD: {rounded_avg}")
@@ -5,28 +5,26 @@
 ПРОВЕРИТЬ!
 """
 
-import pandas as pd
-import math
+import sys
+from pathlib import Path
 
-# Загрузка данных
-transactions = pd.read_parquet('../../free_analysis/src/transaction_fraud_data.parquet')
-exchange_rates = pd.read_parquet('../../free_analysis/src/historical_currency_exchange.parquet')
+import math
 
-# Фильтрация немошеннических операций
-legit_trans = transactions[transactions['is_fraud'] == False].copy()
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from common.currency import RateTable
+from common.loader import load_exchange_rates
+from common.moments import usd_moments_by_fraud
+from common.trace import stage
 
-# Добавление даты и объединение с курсами
-legit_trans['date'] = legit_trans['timestamp'].dt.date
-merged = legit_trans.merge(exchange_rates, on='date', how='left')
+# Загрузка курсов валют
+with stage('rates'):
+    rates = RateTable.from_frame(load_exchange_rates())
 
-# Конвертация в USD
-merged['amount_usd'] = merged.apply(
-    lambda row: row['amount'] / row[row['currency']] if row['currency'] != 'USD' else row['amount'],
-    axis=1
-)
+# Конвертация в USD и расчет моментов параллельно по частям файла
+moments = usd_moments_by_fraud(rates)[False]
 
 # Расчет стандартного отклонения и округление
-std_usd = merged['amount_usd'].std()
+std_usd = moments.std
 rounded_std = math.ceil(std_usd)
 
 print(f"Стандартное отклонение сумм в USD: {rounded_std}")
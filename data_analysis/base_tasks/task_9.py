@@ -3,28 +3,24 @@
 Округлите ответ до целых значений вверх, например 105
 """
 
-import pandas as pd
-import math
+import sys
+from pathlib import Path
 
-# Загрузка данных
-transactions = pd.read_parquet('../../free_analysis/src/transaction_fraud_data.parquet')
-exchange_rates = pd.read_parquet('../../free_analysis/src/historical_currency_exchange.parquet')
+import math
 
-# Фильтрация мошеннических операций
-fraud_trans = transactions[transactions['is_fraud'] == True].copy()
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from common.currency import RateTable
+from common.loader import load_exchange_rates
+from common.moments import usd_moments_by_fraud
 
-# Добавление даты и объединение с курсами
-fraud_trans['date'] = fraud_trans['timestamp'].dt.date
-merged = fraud_trans.merge(exchange_rates, on='date', how='left')
+# Загрузка курсов валют
+rates = RateTable.from_frame(load_exchange_rates())
 
-# Конвертация в USD
-merged['amount_usd'] = merged.apply(
-    lambda row: row['amount'] / row[row['currency']] if row['currency'] != 'USD' else row['amount'],
-    axis=1
-)
+# Конвертация в USD и расчет моментов параллельно по частям файла
+moments = usd_moments_by_fraud(rates)[True]
 
 # Расчет среднего и округление
-avg_usd = merged['amount_usd'].mean()
+avg_usd = moments.mean
 rounded_avg = math.ceil(avg_usd)
 
 print(f"Средняя сумма мошеннических операций в USD: {rounded_avg}")
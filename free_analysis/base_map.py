@@ -1,27 +1,19 @@
-import pandas as pd
-import geopandas as gpd
+import sys
+from pathlib import Path
+
 import matplotlib.pyplot as plt
 import matplotlib.colors  # Правильный импорт модуля цветов
 import numpy as np
-import os
-from urllib.request import urlretrieve
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from common.cube import rollup
+from common.geodata import load_world
 
-def load_geodata():
-    os.makedirs('geodata', exist_ok=True)
-    geofile = 'geodata/ne_110m_admin_0_countries.zip'
-
-    if not os.path.exists(geofile):
-        try:
-            print("Скачиваем геоданные...")
-            url = 'https://naciscdn.org/naturalearth/110m/cultural/ne_110m_admin_0_countries.zip'
-            urlretrieve(url, geofile)
-        except Exception as e:
-            print(f"Ошибка загрузки: {e}")
-            return None
 
+def load_geodata():
+    # Из архива в репозитории через облегченный кэш, без скачивания
     try:
-        return gpd.read_file(geofile)
+        return load_world()
     except Exception as e:
         print(f"Ошибка чтения: {e}")
         return None
@@ -29,11 +21,10 @@ def load_geodata():
 
 def load_transaction_data():
     try:
-        transactions = pd.read_parquet("src/transaction_fraud_data.parquet")
-        fraud_data = transactions[transactions['is_fraud']].groupby('country').agg(
-            fraud_count=('transaction_id', 'count'),
-            total_amount=('amount', 'sum')
-        ).reset_index()
+        # Количество и сумма мошеннических операций по странам из агрегированного куба
+        fraud_data = rollup(['country'])[['country', 'fraud_count', 'fraud_amount_sum']]
+        fraud_data = fraud_data.rename(columns={'fraud_amount_sum': 'total_amount'})
+        fraud_data = fraud_data[fraud_data['fraud_count'] > 0]
         return fraud_data
     except Exception as e:
         print(f"Ошибка: {e}")
@@ -43,8 +34,7 @@ def load_transaction_data():
 def plot_fraud_map(world, fraud_data):
     merged = world.merge(
         fraud_data,
-        left_on='NAME',
-        right_on='country',
+        on='country',
         how='left'
     )
 
@@ -112,10 +102,9 @@ def plot_fraud_map(world, fraud_data):
     top_countries = merged.nlargest(15, 'fraud_count')
     for idx, row in top_countries.iterrows():
         if row['fraud_count'] > 0:
-            centroid = row.geometry.centroid
             ax.annotate(
                 text=f"{row['NAME']}\n{int(row['fraud_count']):,}",
-                xy=(centroid.x, centroid.y),
+                xy=(row['label_x'], row['label_y']),
                 fontsize=10,
                 ha='center',
                 bbox=dict(boxstyle="round,pad=0.3", fc="white", alpha=0.8)
@@ -1,28 +1,20 @@
-import pandas as pd
-import geopandas as gpd
+import sys
+from pathlib import Path
+
 import matplotlib.pyplot as plt
 import matplotlib.colors
 import numpy as np
-import os
-from urllib.request import urlretrieve
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from common.cube import rollup
+from common.geodata import load_world
 
 
 # 1. Загрузка геоданных
 def load_geodata():
-    os.makedirs('geodata', exist_ok=True)
-    geofile = 'geodata/ne_110m_admin_0_countries.zip'
-
-    if not os.path.exists(geofile):
-        try:
-            print("Скачиваем геоданные...")
-            url = 'https://naciscdn.org/naturalearth/110m/cultural/ne_110m_admin_0_countries.zip'
-            urlretrieve(url, geofile)
-        except Exception as e:
-            print(f"Ошибка загрузки: {e}")
-            return None
-
+    # Из архива в репозитории через облегченный кэш, без скачивания
     try:
-        return gpd.read_file(geofile)
+        return load_world()
     except Exception as e:
         print(f"Ошибка чтения: {e}")
         return None
@@ -31,13 +23,9 @@ def load_geodata():
 # 2. Загрузка и подготовка данных
 def load_transaction_data():
     try:
-        transactions = pd.read_parquet("src/transaction_fraud_data.parquet")
-
-        # Считаем общее количество операций и мошеннических по странам
-        country_stats = transactions.groupby('country').agg(
-            total_count=('transaction_id', 'count'),
-            fraud_count=('is_fraud', 'sum')
-        ).reset_index()
+        # Общее количество операций и мошеннических по странам из агрегированного куба
+        country_stats = rollup(['country'])[['country', 'count', 'fraud_count']]
+        country_stats = country_stats.rename(columns={'count': 'total_count'})
 
         # Вычисляем долю мошеннических операций
         country_stats['fraud_ratio'] = country_stats['fraud_count'] / country_stats['total_count']
@@ -53,8 +41,7 @@ def plot_fraud_ratio_map(world, fraud_data):
     # Объединяем данные
     merged = world.merge(
         fraud_data,
-        left_on='NAME',
-        right_on='country',
+        on='country',
         how='left'
     )
 
@@ -119,10 +106,9 @@ def plot_fraud_ratio_map(world, fraud_data):
     high_risk = merged.nlargest(15, 'fraud_ratio')
     for idx, row in high_risk.iterrows():
         if row['fraud_ratio'] > 0:
-            centroid = row.geometry.centroid
             ax.annotate(
                 text=f"{row['NAME']}\n{row['fraud_ratio'] * 100:.2f}%",
-                xy=(centroid.x, centroid.y),
+                xy=(row['label_x'], row['label_y']),
                 fontsize=10,
                 ha='center',
                 bbox=dict(boxstyle="round,pad=0.3", fc="white", alpha=0.8)
@@ -1,30 +1,32 @@
+import sys
+from pathlib import Path
+
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from common.cube import rollup
+
 # Настройки отображения
 pd.set_option('display.max_rows', None)
 sns.set(style="whitegrid")
 plt.rcParams['figure.figsize'] = (14, 8)
 plt.rcParams['font.size'] = 12
 
-# 1. Загрузка данных
+# 1-2. Анализ мошенничества по странам из агрегированного куба
 try:
-    df = pd.read_parquet('src/transaction_fraud_data.parquet')
-    print(f"Загружено {len(df)} транзакций. Пример данных:")
-    print(df[['country', 'amount', 'is_fraud']].sample(3))
+    country_stats = rollup(['country']).rename(columns={
+        'count': 'total_transactions',
+        'fraud_count': 'fraud_transactions',
+    })[['country', 'total_transactions', 'fraud_transactions', 'avg_amount']]
+    print(f"Обработано {country_stats['total_transactions'].sum()} транзакций. Пример данных:")
+    print(country_stats.sample(3))
 except Exception as e:
     print(f"Ошибка загрузки: {e}")
     exit()
 
-# 2. Анализ мошенничества по странам
-country_stats = df.groupby('country').agg(
-    total_transactions=('is_fraud', 'count'),
-    fraud_transactions=('is_fraud', 'sum'),
-    avg_amount=('amount', 'mean')
-).reset_index()
-
 country_stats['fraud_rate'] = country_stats['fraud_transactions'] / country_stats['total_transactions']
 country_stats['fraud_percentage'] = country_stats['fraud_rate'] * 100
 
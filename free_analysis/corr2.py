@@ -1,10 +1,15 @@
+import sys
+from pathlib import Path
+
 import seaborn as sns
 import matplotlib.pyplot as plt
-import pandas as pd
 import numpy as np
 
-# Загрузка данных
-df = pd.read_parquet('src/transaction_fraud_data.parquet')
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from common.cube import rollup
+
+# Загрузка агрегатов по категориям и странам
+df = rollup(['vendor_category', 'country'])
 
 
 # Определяем страны для первой группы
@@ -16,17 +21,16 @@ df['country_group'] = np.where(
 )
 
 # Вычисляем долю мошеннических транзакций
-fraud_stats = (df.groupby(['vendor_category', 'country_group'])['is_fraud']
-                .mean()
-                .mul(100)
-                .reset_index()
-                .rename(columns={'is_fraud': 'fraud_percentage'}))
+fraud_stats = df.groupby(['vendor_category', 'country_group'])[['fraud_count', 'count']].sum()
+fraud_stats = (fraud_stats['fraud_count']
+               .div(fraud_stats['count'])
+               .mul(100)
+               .rename('fraud_percentage')
+               .reset_index())
 
 # Сортируем категории по общей доле мошенничества
-category_order = (df.groupby('vendor_category')['is_fraud']
-                  .mean()
-                  .sort_values(ascending=False)
-                  .index)
+category_order = (rollup(['vendor_category'])
+                  .sort_values('fraud_rate', ascending=False)['vendor_category'])
 
 # Настройка стиля seaborn
 sns.set_style("whitegrid")
@@ -70,7 +74,7 @@ plt.legend(
 )
 
 # Добавляем общую информацию
-total_fraud = df['is_fraud'].mean() * 100
+total_fraud = rollup([]).loc[0, 'fraud_rate'] * 100
 plt.axhline(total_fraud, color='red', linestyle='--', alpha=0.7)
 plt.text(
     x=0.95, y=total_fraud + 0.5,
@@ -1,52 +1,70 @@
+import sys
+from pathlib import Path
+
 import pandas as pd
-import numpy as np
 import matplotlib.pyplot as plt
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from common.kernels import Groups
+from common.loader import load_transactions
+from common.trace import stage, traced
+
 try:
+    required_columns = ['vendor_category', 'is_fraud']
+    features_to_compare = [
+        'vendor_type', 'is_card_present', 'channel',
+        'is_outside_home_country', 'is_high_risk_vendor', 'is_weekend'
+    ]
+
     # Загрузка данных с обработкой возможных ошибок
     try:
-        df = pd.read_parquet('src/transaction_fraud_data.parquet')
+        df = load_transactions(columns=required_columns + features_to_compare + [
+            'amount', 'last_hour_activity.num_transactions', 'last_hour_activity.total_amount'
+        ])
     except Exception as e:
         raise Exception(f"Ошибка при загрузке файла: {str(e)}")
 
     # Проверка наличия необходимых колонок
-    required_columns = ['vendor_category', 'is_fraud']
     missing_columns = [col for col in required_columns if col not in df.columns]
     if missing_columns:
         raise Exception(f"Отсутствуют обязательные колонки: {missing_columns}")
 
     # 1. Расчет доли мошенничества по категориям вендоров
-    fraud_rate_by_category = df.groupby('vendor_category')['is_fraud'].mean().sort_values(ascending=False)
+    categories = Groups.from_frame(df, ['vendor_category'])
+    fraud_rate_by_category = categories.to_series(categories.rate(df['is_fraud'])).sort_values(ascending=False)
 
     # Разделение категорий на две группы
     high_fraud_categories = fraud_rate_by_category[fraud_rate_by_category > 0.2].index.tolist()
     low_fraud_categories = fraud_rate_by_category[fraud_rate_by_category <= 0.2].index.tolist()
 
     # Создание колонки для группировки
-    df['fraud_group'] = np.where(
-        df['vendor_category'].isin(high_fraud_categories),
-        'High Fraud (>20%)',
-        'Low Fraud (≤20%)'
-    )
+    # Категория, а не np.where со строками: тот выдает массив Python-строк на каждую строку
+    df['fraud_group'] = pd.Categorical.from_codes(
+        (~df['vendor_category'].isin(high_fraud_categories)).astype('int8'),
+        ['High Fraud (>20%)', 'Low Fraud (≤20%)']
+    ).remove_unused_categories()
 
 
     # 2. Функция для сравнения групп с обработкой ошибок
+    @traced()
     def safe_compare_groups(df, column, plot=False):
         try:
             if column not in df.columns:
                 print(f"Колонка '{column}' отсутствует в данных. Пропускаем.")
                 return None
 
-            comparison = df.groupby(['fraud_group', column])['is_fraud'].count().unstack().fillna(0)
-            comparison_pct = comparison.div(comparison.sum(axis=1), axis=0) * 100
+            with stage('groupby'):
+                comparison = df.groupby(['fraud_group', column], observed=True)['is_fraud'].count().unstack().fillna(0)
+                comparison_pct = comparison.div(comparison.sum(axis=1), axis=0) * 100
 
             if plot:
                 try:
-                    comparison_pct.T.plot(kind='bar', stacked=True, figsize=(10, 6))
-                    plt.title(f'Распределение {column} по группам мошенничества')
-                    plt.ylabel('Доля, %')
-                    plt.xticks(rotation=45)
-                    plt.show()
+                    with stage('plot'):
+                        comparison_pct.T.plot(kind='bar', stacked=True, figsize=(10, 6))
+                        plt.title(f'Распределение {column} по группам мошенничества')
+                        plt.ylabel('Доля, %')
+                        plt.xticks(rotation=45)
+                        plt.show()
                 except Exception as e:
                     print(f"Ошибка при построении графика для {column}: {str(e)}")
 
@@ -65,11 +83,6 @@ try:
         print(vendor_category_comparison)
 
     # Сравнение по другим ключевым признакам
-    features_to_compare = [
-        'vendor_type', 'is_card_present', 'channel',
-        'is_outside_home_country', 'is_high_risk_vendor', 'is_weekend'
-    ]
-
     for feature in features_to_compare:
         print("\n" + "=" * 50)
         print(f"Сравнение по признаку '{feature}':")
@@ -97,11 +110,12 @@ try:
         # Визуализация числовых признаков
         for feature in numeric_features:
             try:
-                plt.figure(figsize=(10, 6))
-                df.boxplot(column=feature, by='fraud_group', vert=False)
-                plt.title(f'Распределение {feature} по группам мошенничества')
-                plt.suptitle('')
-                plt.show()
+                with stage('boxplot'):
+                    plt.figure(figsize=(10, 6))
+                    df.boxplot(column=feature, by='fraud_group', vert=False)
+                    plt.title(f'Распределение {feature} по группам мошенничества')
+                    plt.suptitle('')
+                    plt.show()
             except Exception as e:
                 print(f"Ошибка при построении boxplot для {feature}: {str(e)}")
     except Exception as e:
@@ -1,25 +1,68 @@
-import pandas as pd
+import shutil
+import sys
+from pathlib import Path
 
-# Загрузка данных
-df = pd.read_parquet('src/transaction_fraud_data.parquet')
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from common.config import FRAUD_RATE_THRESHOLD, RISK_SPLIT_PATH, TRANSACTIONS_PATH
+from common.cube import rollup
+from common.loader import read_table
+
+# Партиция страна/день - порядка 20 тыс. строк, отсортированных по времени.
+# Группы по 4096 строк дают несколько row group'ов на файл, и min/max по
+# timestamp отсекают часы внутри дня; файл на партицию по-прежнему один
+ROW_GROUP_SIZE = 4 * 1024
 
 # Расчет доли мошенничества по странам
-country_stats = df.groupby('country')['is_fraud'].mean().reset_index()
-country_stats.columns = ['country', 'fraud_rate']
+country_stats = rollup(['country'])[['country', 'fraud_rate']]
 
 # Список высокорисковых стран (≥20%)
-high_risk_countries = country_stats[country_stats['fraud_rate'] >= 0.20]['country'].tolist()
+high_risk_countries = country_stats[country_stats['fraud_rate'] >= FRAUD_RATE_THRESHOLD]['country'].tolist()
+
+# Загрузка данных в Arrow без конвертации в pandas
+table = read_table(TRANSACTIONS_PATH, flatten=False, compact=False)
+
+# Колонки партиционирования: группа риска и дата транзакции
+is_high_risk = pc.is_in(table['country'], value_set=pa.array(high_risk_countries, pa.string()))
+table = table.append_column('risk_group', pc.if_else(is_high_risk, 'high', 'low'))
+table = table.append_column('date', pc.cast(table['timestamp'], pa.date32()))
+
+# Сортировка по времени: внутри каждой партиции строки идут по timestamp
+table = table.sort_by('timestamp')
 
-# Разделение датасета
-high_risk_df = df[df['country'].isin(high_risk_countries)]
-low_risk_df = df[~df['country'].isin(high_risk_countries)]
+# Сохранение: risk_group=.../country=.../date=.../*.parquet со статистиками по колонкам.
+# Пишем в соседний каталог и подменяем целиком: иначе при смене группы риска
+# страны ее старые файлы остались бы в прежнем risk_group=...
+tmp_path = RISK_SPLIT_PATH.with_name(RISK_SPLIT_PATH.name + '.tmp')
+shutil.rmtree(tmp_path, ignore_errors=True)
+ds.write_dataset(
+    table,
+    tmp_path,
+    format='parquet',
+    partitioning=ds.partitioning(
+        pa.schema([('risk_group', pa.string()), ('country', pa.string()), ('date', pa.date32())]),
+        flavor='hive'
+    ),
+    file_options=ds.ParquetFileFormat().make_write_options(write_statistics=True),
+    min_rows_per_group=ROW_GROUP_SIZE,
+    max_rows_per_group=ROW_GROUP_SIZE,
+    max_rows_per_file=16 * ROW_GROUP_SIZE,
+    preserve_order=True
+)
+old_path = RISK_SPLIT_PATH.with_name(RISK_SPLIT_PATH.name + '.old')
+shutil.rmtree(old_path, ignore_errors=True)
+if RISK_SPLIT_PATH.exists():
+    RISK_SPLIT_PATH.rename(old_path)
+tmp_path.rename(RISK_SPLIT_PATH)
+shutil.rmtree(old_path, ignore_errors=True)
 
-# Сохранение
-high_risk_df.to_parquet('high_risk_countries.parquet', index=False)
-low_risk_df.to_parquet('low_risk_countries.parquet', index=False)
+high_risk_count = pc.sum(is_high_risk).as_py() or 0
 
-print(f'Сохранено:')
-print(f'- high_risk_countries.parquet ({len(high_risk_df)} записей)')
-print(f'- low_risk_countries.parquet ({len(low_risk_df)} записей)')
+print(f'Сохранено в {RISK_SPLIT_PATH}:')
+print(f'- risk_group=high ({high_risk_count} записей)')
+print(f'- risk_group=low ({table.num_rows - high_risk_count} записей)')
 print(f'\nСписок высокорисковых стран (≥20% мошенничества):')
-print(high_risk_countries)
\ No newline at end of file
+print(high_risk_countries)
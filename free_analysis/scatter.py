@@ -1,8 +1,16 @@
+import sys
+from pathlib import Path
+
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 from adjustText import adjust_text
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from common.config import RISK_SPLIT_PATH
+from common.kernels import Groups
+from common.loader import load_transactions
+
 # Настройка компактного стиля
 plt.style.use('seaborn-v0_8')
 sns.set_theme(style="whitegrid")
@@ -10,13 +18,18 @@ plt.rcParams['figure.figsize'] = (16, 8)  # Уменьшенная высота
 plt.rcParams['font.size'] = 9
 
 # Загрузка и подготовка данных
-# df = pd.read_parquet('src/transaction_fraud_data.parquet')
-df = pd.read_parquet('src/high_risk_countries.parquet')
-country_stats = df.groupby('country').agg(
-    total_transactions=('is_fraud', 'count'),
-    fraud_transactions=('is_fraud', 'sum'),
-    avg_amount=('amount', 'mean')
-).reset_index()
+# df = load_transactions(columns=['country', 'is_fraud', 'amount'])
+df = load_transactions(
+    columns=['country', 'is_fraud', 'amount'],
+    filters=[('risk_group', '==', 'high')],
+    path=RISK_SPLIT_PATH
+)
+countries = Groups.from_frame(df, ['country'])
+country_stats = pd.DataFrame({
+    'total_transactions': countries.to_series(countries.counts),
+    'fraud_transactions': countries.to_series(countries.count(where=df['is_fraud'])),
+    'avg_amount': countries.to_series(countries.mean(df['amount'])),
+}).reset_index()
 country_stats['fraud_rate'] = country_stats['fraud_transactions'] / country_stats['total_transactions'] * 100
 
 # Создание компактного графика
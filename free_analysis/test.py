@@ -1,11 +1,13 @@
-import pandas as pd
+import sys
+from pathlib import Path
 
-# Загрузка данных
-df = pd.read_parquet('src/transaction_fraud_data.parquet')
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from common.streaming import stream_aggregate
 
-# Расчет mean и std для суммы транзакций
-mean_amount = df['amount'].mean()
-std_amount = df['amount'].std()
+# Расчет mean и std для суммы транзакций потоково, по кускам файла
+stats = stream_aggregate([], {'mean': ('amount', 'mean'), 'std': ('amount', 'std')})
+mean_amount = stats.loc[0, 'mean']
+std_amount = stats.loc[0, 'std']
 
 print(f"Математическое ожидание суммы транзакций: {mean_amount:.2f}")
 print(f"Стандартное отклонение суммы транзакций: {std_amount:.2f}")
\ No newline at end of file
@@ -1,15 +1,15 @@
-import pandas as pd
-import matplotlib.pyplot as plt
+import sys
+from pathlib import Path
 
-# Загрузка данных
-df = pd.read_parquet('src/transaction_fraud_data.parquet')
+import matplotlib.pyplot as plt
 
-# Извлечение даты и часа из timestamp
-df['date'] = df['timestamp'].dt.date
-df['hour'] = df['timestamp'].dt.hour
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from common.cube import rollup
 
-# Группировка по дате и категории вендора
-grouped_data = df.groupby(['date', 'vendor_category']).size().unstack()
+# Количество транзакций по дате и категории вендора из агрегированного куба
+grouped_data = rollup(['date', 'vendor_category']).pivot(
+    index='date', columns='vendor_category', values='count'
+)
 
 # Построение графика
 plt.figure(figsize=(12, 6))
@@ -1,7 +1,55 @@
-import pandas as pd
+"""
+Без аргументов - загрузка и вывод обоих датасетов.
 
-hce_df = pd.read_parquet('free_analysis/src/historical_currency_exchange.parquet', engine='pyarrow')
-tfd_df = pd.read_parquet('free_analysis/src/transaction_fraud_data.parquet', engine='pyarrow')
+    python main.py serve [--port N | --socket PATH] [--workers N]
+        держать данные в памяти и отвечать на запросы (common.server)
+    python main.py query NAME [параметр=значение ...] [--port N | --socket PATH]
+        задать запрос работающему серверу
+"""
 
-print(hce_df)
-print(tfd_df)
\ No newline at end of file
+import argparse
+import json
+import sys
+
+from common.config import SERVER_PORT
+
+
+def show():
+    from common.loader import load_exchange_rates, load_transactions
+
+    hce_df = load_exchange_rates()
+    tfd_df = load_transactions()
+
+    print(hce_df)
+    print(tfd_df)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Анализ транзакций')
+    commands = parser.add_subparsers(dest='command')
+
+    serve_parser = commands.add_parser('serve', help='сервер запросов с данными в памяти')
+    query_parser = commands.add_parser('query', help='запрос к серверу')
+    for p in (serve_parser, query_parser):
+        p.add_argument('--port', type=int, default=SERVER_PORT)
+        p.add_argument('--socket', default=None, help='Unix-сокет вместо TCP')
+    serve_parser.add_argument('--workers', type=int, default=None, help='размер пула потоков')
+    query_parser.add_argument('name', help='имя запроса, например task_7, fraud_rates, percentile, queries')
+    query_parser.add_argument('params', nargs='*', help='параметры вида ключ=значение')
+
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        from common.server import serve
+        serve(args.port, args.socket, args.workers)
+    elif args.command == 'query':
+        from common.client import request
+        params = dict(p.split('=', 1) for p in args.params)
+        try:
+            body = request(args.name, params, args.port, args.socket)
+        except (OSError, RuntimeError) as e:
+            sys.exit(f'Ошибка: {e}')
+        print(json.dumps(body['result'], ensure_ascii=False, indent=2))
+        print(f"({body['elapsed_ms']:.1f} мс на сервере)", file=sys.stderr)
+    else:
+        show()